@@ -1,12 +1,17 @@
 from flask import Flask
 import flask
 from app.api.routes import api_bp
+from app.api.metrics import metrics_bp
+from app.api.encoding import OrjsonProvider, comprimir_resposta
 from app.config_env import Config
 
 def create_app():
     app = Flask(__name__)
+    app.json = OrjsonProvider(app)
+    app.after_request(comprimir_resposta)
     #app.config.from_object(Config)
     
     app.register_blueprint(api_bp, url_prefix='/api')
+    app.register_blueprint(metrics_bp, url_prefix='/api')
     
     return app
\ No newline at end of file
@@ -0,0 +1,58 @@
+import gzip
+import orjson
+from flask import request
+from flask.json.provider import JSONProvider
+from app.config_env import Config
+
+try:
+    import brotli
+except ImportError:  # br só é oferecido com o pacote Brotli instalado
+    brotli = None
+
+OPCOES_ORJSON = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+# Tipos de resposta que valem a pena comprimir
+COMPRIMIVEIS = {"application/json", "text/plain"}
+
+
+class OrjsonProvider(JSONProvider):
+    """
+    jsonify/get_json com orjson: bem mais rápido que o json da biblioteca
+    padrão e serializa arrays/escalares numpy e datas diretamente (NaN vira
+    null). O que ele não conhece (ex: pd.Timestamp) sai como str.
+    """
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=str, option=OPCOES_ORJSON).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(orjson.dumps(obj, default=str, option=OPCOES_ORJSON),
+                                        mimetype="application/json")
+
+
+def comprimir_resposta(response):
+    """
+    after_request: comprime com br (se disponível) ou gzip, conforme o
+    Accept-Encoding, as respostas JSON/texto a partir de COMPRESS_MIN_BYTES.
+    Respostas em streaming passam sem compressão para não atrasar os eventos.
+    """
+    if (response.direct_passthrough or response.is_streamed or response.status_code < 200
+            or response.mimetype not in COMPRIMIVEIS or "Content-Encoding" in response.headers):
+        return response
+    response.vary.add("Accept-Encoding")
+    dados = response.get_data()
+    if len(dados) < Config.COMPRESS_MIN_BYTES:
+        return response
+
+    aceitos = request.accept_encodings
+    if brotli is not None and aceitos["br"]:
+        response.set_data(brotli.compress(dados, quality=Config.COMPRESS_LEVEL))
+        response.headers["Content-Encoding"] = "br"
+    elif aceitos["gzip"]:
+        response.set_data(gzip.compress(dados, compresslevel=Config.COMPRESS_LEVEL, mtime=0))
+        response.headers["Content-Encoding"] = "gzip"
+    return response
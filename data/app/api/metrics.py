@@ -0,0 +1,28 @@
+from flask import Blueprint, Response
+from app.services import tracing
+from app.services.model_registry import registry
+
+metrics_bp = Blueprint('metrics', __name__)
+
+# Métricas do registro de modelos: nome em registry.stats() -> (métrica, tipo, ajuda, labels)
+_REGISTRO = {
+    "hits": ("app_cache_requests_total", "counter", "Consultas aos caches, por resultado", {"cache": "model_registry", "result": "hit"}),
+    "misses": ("app_cache_requests_total", "counter", "Consultas aos caches, por resultado", {"cache": "model_registry", "result": "miss"}),
+    "shared_loads": ("app_model_registry_shared_loads_total", "counter",
+                     "Cargas de modelo aproveitadas de outra requisição em andamento", {}),
+    "loads": ("app_model_registry_loads_total", "counter", "Modelos carregados do banco", {}),
+    "evictions": ("app_model_registry_evictions_total", "counter", "Modelos descartados da memória (LRU)", {}),
+    "entries": ("app_model_registry_entries", "gauge", "Modelos em memória", {}),
+    "bytes": ("app_model_registry_bytes", "gauge", "Tamanho estimado dos modelos em memória", {}),
+}
+
+
+@metrics_bp.route('/metrics', methods=['GET'])
+def metrics():
+    """Métricas da aplicação no formato texto do Prometheus."""
+    extras = [
+        (nome, tipo, ajuda, labels, valor)
+        for chave, valor in registry.stats().items()
+        for nome, tipo, ajuda, labels in [_REGISTRO[chave]]
+    ]
+    return Response(tracing.exportar_prometheus(extras), mimetype='text/plain; version=0.0.4')
@@ -1,59 +1,322 @@
-from flask import Blueprint, jsonify, request
-import pandas as pd
-from app.services.collect_api_giovanni import colect_variables
-from app.services.transform import transform
-from app.services.modelos import modelo
+import queue
+import threading
+from concurrent.futures import BrokenExecutor
+import orjson
+import psycopg2
+import requests
+from sqlalchemy.exc import SQLAlchemyError
+from flask import Blueprint, Response, jsonify, request, url_for
+from app.services.pipeline import executar_pipeline
+from app.services.jobs import jobs
+from app.services.batch import executar_lote
+from app.services.global_model import atender_celula_nova
+from app.services.climatology import consultar as consultar_climatologia
+from app.services.modelos import janela_previsao
+from app.services.collect_api_giovanni import ColetaIncompleta
+from app.utils.grid import snap_to_grid
+from app.config_env import Config
+from app.api.encoding import OPCOES_ORJSON
+from app.services.forecast_format import compactar, compactar_bloco
 # A função de load não é mais necessária se o objetivo é apenas retornar o JSON
 # from app.services.load import load_data_to_db 
 
 api_bp = Blueprint('api', __name__)
 
+def _parametros(data):
+    if not data:
+        return None, (jsonify({"error": "Invalid request: Missing JSON body"}), 400)
+    try:
+        return (data['lat'], data['lon'], data['datetime']), None
+    except KeyError as e:
+        return None, (jsonify({"error": f"Missing required parameter: {e}"}), 400)
+
+def _booleano(body, nome, padrao):
+    """Parâmetro booleano opcional: só aceita true/false do JSON (não "false" em texto)."""
+    valor = body.get(nome, padrao)
+    if not isinstance(valor, bool):
+        raise ValueError(f"{nome} must be a JSON boolean")
+    return valor
+
+def _validar_consulta(lat, lon, date, inicio=None, fim=None):
+    """Coordenadas, data e janela válidas (ValueError caso contrário), antes de rodar o pipeline."""
+    try:
+        snap_to_grid(lat, lon)
+        janela_previsao(date, inicio, fim)
+    except TypeError as e:
+        raise ValueError(str(e))
+
+# Formatos do modo streaming do /collect ('stream' no corpo ou o Accept da requisição)
+FORMATOS_STREAM = {"ndjson": "application/x-ndjson", "sse": "text/event-stream"}
+
+def _formato_stream(body):
+    formato = body.get('stream')
+    if formato:
+        if formato not in FORMATOS_STREAM:
+            raise ValueError(f"stream must be one of {sorted(FORMATOS_STREAM)}")
+        return formato
+    aceitos = set(request.accept_mimetypes.values())
+    for formato, mimetype in FORMATOS_STREAM.items():
+        if mimetype in aceitos:
+            return formato
+    return None
+
+# Formatos do JSON de previsão: o completo (um horário por valor) e o compacto
+# (eixo de tempo compartilhado e valores arredondados; ver forecast_format)
+FORMATOS_PREVISAO = ("full", "compact")
+
+def _formato_previsao(body):
+    formato = body.get('format', 'full')
+    if formato not in FORMATOS_PREVISAO:
+        raise ValueError(f"format must be one of {list(FORMATOS_PREVISAO)}")
+    return formato
+
+def _envelope(lat, lon, date):
+    return {
+        "parameters_received": {
+            "lat": lat,
+            "lon": lon,
+            "time_start": date,
+        },
+        "grid_cell": dict(zip(("lat", "lon"), snap_to_grid(lat, lon))),
+    }
+
+def _prever(lat, lon, date, opcoes, **callbacks):
+    """Previsão para o /collect: (forecast, cached, origem)."""
+    # Célula nova: responde na hora pelo modelo global da região e treina o
+    # modelo próprio da célula em segundo plano
+    forecast = atender_celula_nova(lat, lon, date, **opcoes)
+    if forecast is not None:
+        jobs.submit(lat, lon, date)
+        return forecast, False, "global"
+    forecast, cached = executar_pipeline(lat, lon, date, **opcoes, **callbacks)
+    return forecast, cached, "local"
+
+# Falhas de dependências (Giovanni, banco, pool de treino) que justificam
+# responder com a climatologia; qualquer outra exceção é um erro de verdade
+FALHAS_EXTERNAS = (
+    ColetaIncompleta, requests.RequestException, psycopg2.Error, SQLAlchemyError,
+    BrokenExecutor, TimeoutError, ConnectionError,
+)
+
+def _climatologia(lat, lon, date, erro):
+    """
+    Sem previsão (ex: Giovanni ou banco fora do ar): resposta com a
+    climatologia da célula, se houver histórico local. None se `erro` não
+    é uma falha de dependência ou se não há climatologia.
+    """
+    if not isinstance(erro, FALHAS_EXTERNAS):
+        return None
+    try:
+        climatologia = consultar_climatologia(lat, lon, date)
+    except Exception:
+        climatologia = None
+    if climatologia is None:
+        return None
+    return {
+        "message": "Forecast unavailable; returning climatology.",
+        **_envelope(lat, lon, date),
+        "model": "climatology",
+        "details": str(erro),
+        "data": climatologia,
+    }
+
 @api_bp.route('/collect', methods=['POST'])
 def collect_and_load_data():
     """
     Endpoint to trigger data collection, transformation, and return the resulting DataFrame as JSON.
+    With "stream": "ndjson" | "sse" in the body (or a matching Accept header), progress and each
+    variable's forecast are sent as soon as they are ready. "format": "compact" returns the
+    forecast with a shared start/step time axis and rounded values.
     """
-    data = request.get_json()
-    if not data:
-        return jsonify({"error": "Invalid request: Missing JSON body"}), 400
+    params, erro = _parametros(request.get_json())
+    if erro:
+        return erro
+    lat, lon, date = params
+    body = request.get_json()
 
     try:
-        lat = data['lat']
-        lon = data['lon']
-        date = data['datetime']
-        time_start = "2020-01-01T00:00:00"
-        time_end = "2025-09-28T00:00:00"
-        lista_merra = ['M2I1NXLFO_5_12_4_QLML', 'M2I1NXLFO_5_12_4_TLML', 'M2I1NXLFO_5_12_4_SPEEDLML']
-        lista_merra2 = ['M2T1NXFLX_5_12_4_PRECTOTCORR', 'M2T1NXSLV_5_12_4_TQV']
-    except KeyError as e:
-        return jsonify({"error": f"Missing required parameter: {e}"}), 400
+        # Opcionais: janela customizada ('start'/'end') e 'intervals': false para pular a incerteza
+        opcoes = dict(inicio=body.get('start'), fim=body.get('end'), intervalos=_booleano(body, 'intervals', True))
+        _validar_consulta(lat, lon, date, opcoes['inicio'], opcoes['fim'])
+        formato = _formato_stream(body)
+        compacto = _formato_previsao(body) == "compact"
+    except ValueError as e:
+        return jsonify({"error": f"Invalid parameter: {e}"}), 400
+    if formato:
+        return _collect_stream(formato, lat, lon, date, opcoes, compacto)
 
     try:
-        # 1. Collect Data
-        print('Iniciando coleta de dados...')
-        df_merra = colect_variables(lista_merra, lat, lon, time_start, time_end)
-        df_merra2 = colect_variables(lista_merra2, lat, lon, time_start, time_end)
-        
-        # 2. Transform Data
-        df_final = transform(df_merra, df_merra2)
-        
-        # 3. Converte o DataFrame para uma lista de dicionários
-        # O formato 'records' cria uma lista, onde cada item é um dicionário representando uma linha.
-        result_data = df_final.to_dict(orient='records')
-        print('Sucesso sem mod')
-        forecast = modelo(df_final,date)
-        print('Sucesso com mod')
-        print(forecast)
+        forecast, cached, origem = _prever(lat, lon, date, opcoes)
+        if compacto:
+            forecast = compactar(forecast)
         # 4. Return success response com os dados do DataFrame
         return jsonify({
             "message": "Data processed successfully!",
-            "parameters_received": {
-                "lat": lat,
-                "lon": lon,
-                "time_start": date,
-            },
+            **_envelope(lat, lon, date),
+            "cached": cached,
+            "model": origem,
             "data": forecast  # <-- Adiciona os dados do DataFrame na resposta JSON
         }), 200
         
     except Exception as e:
-        return jsonify({"error": "An internal error occurred during data processing.", "details": str(e)}), 500
\ No newline at end of file
+        climatologia = _climatologia(lat, lon, date, e)
+        if climatologia is not None:
+            return jsonify(climatologia), 200
+        return jsonify({"error": "An internal error occurred during data processing.", "details": str(e)}), 500
+
+def _collect_stream(formato, lat, lon, date, opcoes, compacto=False):
+    """
+    Modo streaming do /collect. O pipeline roda numa thread e publica numa
+    fila os eventos, enviados ao cliente à medida que chegam:
+        stage     início de cada etapa do pipeline; 'done' vem depois de
+                  todos os eventos 'variable', em qualquer caminho
+        progress  cada variável baixada do Giovanni (done/total)
+        variable  bloco de previsão de uma variável, assim que ela é prevista
+                  (no formato compacto, com o próprio eixo de tempo em 'time')
+        result    fim: cached/model e os campos do envelope da resposta normal
+        climatology / error  quando não há previsão
+    Se o cliente desconectar, o pipeline segue até o fim e o resultado fica em cache.
+    """
+    eventos = queue.Queue()
+    enviados = set()
+
+    def variavel(tipo, bloco):
+        enviados.add(tipo)
+        eventos.put({"event": "variable", "variable": tipo, "data": compactar_bloco(bloco) if compacto else bloco})
+
+    def progresso(variable, concluidas, total, erro):
+        eventos.put({"event": "progress", "stage": "collect", "variable": variable,
+                     "done": concluidas, "total": total, "error": erro})
+
+    def etapa(nome):
+        # 'done' só sai depois de todos os eventos 'variable' (ver executar)
+        if nome != "done":
+            eventos.put({"event": "stage", "stage": nome})
+
+    def executar():
+        try:
+            forecast, cached, origem = _prever(
+                lat, lon, date, opcoes,
+                on_stage=etapa,
+                on_progress=progresso,
+                on_variable=variavel,
+            )
+            # Previsões vindas de cache (ou do modelo global) saem todas de uma vez aqui
+            for tipo, bloco in forecast['forecast'].items():
+                if tipo not in enviados:
+                    variavel(tipo, bloco)
+            eventos.put({"event": "stage", "stage": "done"})
+            eventos.put({
+                "event": "result",
+                "message": "Data processed successfully!",
+                **_envelope(lat, lon, date),
+                "cached": cached,
+                "model": origem,
+                "location": forecast['location'],
+                "timestamp": forecast['timestamp'],
+            })
+        except Exception as e:
+            climatologia = _climatologia(lat, lon, date, e)
+            if climatologia is not None:
+                eventos.put({"event": "climatology", **climatologia})
+            else:
+                eventos.put({"event": "error", "error": "An internal error occurred during data processing.",
+                             "details": str(e)})
+        finally:
+            eventos.put(None)
+
+    threading.Thread(target=executar, name="collect-stream", daemon=True).start()
+
+    def gerar():
+        for evento in iter(eventos.get, None):
+            texto = orjson.dumps(evento, default=str, option=OPCOES_ORJSON).decode()
+            if formato == "sse":
+                yield f"event: {evento['event']}\ndata: {texto}\n\n"
+            else:
+                yield texto + "\n"
+
+    return Response(gerar(), mimetype=FORMATOS_STREAM[formato],
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@api_bp.route('/collect/batch', methods=['POST'])
+def collect_batch():
+    """
+    Previsões para várias consultas de uma vez: {"queries": [{"lat", "lon",
+    "datetime"[, "start", "end"]}, ...], "intervals": true, "format": "full" |
+    "compact"}. As consultas são
+    agrupadas por célula da grade e cada célula é processada uma única vez;
+    os resultados voltam na ordem das consultas.
+    """
+    body = request.get_json()
+    if not body:
+        return jsonify({"error": "Invalid request: Missing JSON body"}), 400
+    consultas = body.get('queries')
+    if not isinstance(consultas, list) or not consultas:
+        return jsonify({"error": "Missing required parameter: 'queries' (non-empty list)"}), 400
+    if len(consultas) > Config.BATCH_MAX_QUERIES:
+        return jsonify({"error": f"Too many queries (max {Config.BATCH_MAX_QUERIES})"}), 400
+
+    try:
+        compacto = _formato_previsao(body) == "compact"
+        resultados = executar_lote(consultas, intervalos=_booleano(body, 'intervals', True))
+    except ValueError as e:
+        return jsonify({"error": f"Invalid parameter: {e}"}), 400
+    if compacto:
+        for resultado in resultados:
+            if "data" in resultado:
+                resultado["data"] = compactar(resultado["data"])
+    return jsonify({
+        "message": "Data processed successfully!",
+        "queries": len(consultas),
+        "grid_cells": len({(r["grid_cell"]["lat"], r["grid_cell"]["lon"]) for r in resultados}),
+        "errors": sum("error" in r for r in resultados),
+        "results": resultados,
+    }), 200
+
+@api_bp.route('/climatology', methods=['POST'])
+def climatology():
+    """
+    Probabilidades de excedência e percentis históricos da célula para o dia
+    do ano e a hora de 'datetime', a partir das tabelas pré-calculadas.
+    """
+    params, erro = _parametros(request.get_json())
+    if erro:
+        return erro
+    lat, lon, date = params
+
+    try:
+        resultado = consultar_climatologia(lat, lon, date)
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": f"Invalid parameter: {e}"}), 400
+    if resultado is None:
+        return jsonify({"error": "No local history for this grid cell yet"}), 404
+    return jsonify(resultado), 200
+
+@api_bp.route('/jobs', methods=['POST'])
+def submit_job():
+    """
+    Enfileira o pipeline e retorna imediatamente o id do job (202).
+    O andamento e o resultado ficam em GET /api/jobs/<job_id>.
+    """
+    params, erro = _parametros(request.get_json())
+    if erro:
+        return erro
+    lat, lon, date = params
+
+    try:
+        job = jobs.submit(lat, lon, date)
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": f"Invalid parameter: {e}"}), 400
+    return jsonify({
+        "job_id": job.id,
+        "status": job.status,
+        "status_url": url_for('api.get_job', job_id=job.id),
+    }), 202
+
+@api_bp.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Status, etapa atual e (quando concluído) o resultado de um job."""
+    job = jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job.to_dict()), 200
@@ -12,6 +12,91 @@ class Config:
     DB_USER = os.getenv("DB_USER")
     DB_PASS = os.getenv("DB_PASS")
     DB_NAME = os.getenv("DB_NAME")
+
+    # Servidor e pool de conexões (o pool acompanha o número de threads do waitress)
+    WAITRESS_THREADS = int(os.getenv("WAITRESS_THREADS", 8))
+    DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", WAITRESS_THREADS))
+    DB_POOL_MAX_OVERFLOW = int(os.getenv("DB_POOL_MAX_OVERFLOW", 2))
+    DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 30))
+    DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 1800))
+    # Spans mais lentos que isto (ms) são impressos como JSON; 0 desativa
+    TRACE_SLOW_MS = float(os.getenv("TRACE_SLOW_MS", 0))
+    DB_SLOW_QUERY_MS = float(os.getenv("DB_SLOW_QUERY_MS", 1000))
+
+    # Linhas por lote no COPY do histórico
+    HISTORICO_BATCH_SIZE = int(os.getenv("HISTORICO_BATCH_SIZE", 10000))
+
+    # Cache de previsões em memória (antes da tabela 'previsoes')
+    FORECAST_CACHE_SIZE = int(os.getenv("FORECAST_CACHE_SIZE", 1024))
+    FORECAST_CACHE_TTL = float(os.getenv("FORECAST_CACHE_TTL", 3600))
+
+    # Formato compacto das previsões: algarismos significativos dos valores
+    FORECAST_SIGNIFICANT_DIGITS = int(os.getenv("FORECAST_SIGNIFICANT_DIGITS", 4))
+    # Respostas JSON/texto a partir deste tamanho são comprimidas (gzip/br)
+    COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", 1024))
+    COMPRESS_LEVEL = int(os.getenv("COMPRESS_LEVEL", 6))
+
+    # /api/collect/batch: consultas por requisição e células processadas em paralelo
+    BATCH_MAX_QUERIES = int(os.getenv("BATCH_MAX_QUERIES", 1000))
+    BATCH_WORKERS = int(os.getenv("BATCH_WORKERS", 4))
+
+    # Memória máxima (bytes serializados) dos modelos mantidos carregados
+    MODEL_CACHE_MAX_BYTES = int(os.getenv("MODEL_CACHE_MAX_BYTES", 512 * 1024 * 1024))
+    # Depois deste tempo (s), a versão mais recente de um modelo em memória é
+    # conferida no banco (outro processo, como o refresh via cron, pode ter retreinado)
+    MODEL_VERSION_TTL = float(os.getenv("MODEL_VERSION_TTL", 300))
+
+    # Histórico por célula em arquivos colunares (memory-mapped)
+    HISTORY_STORE_DIR = os.getenv("HISTORY_STORE_DIR", os.path.join("cache", "history"))
+
+    # Tabelas climatológicas por célula (dia do ano x hora, janela de ±N dias)
+    CLIMATOLOGY_DIR = os.getenv("CLIMATOLOGY_DIR", os.path.join("cache", "climatology"))
+    CLIMATOLOGY_WINDOW_DAYS = int(os.getenv("CLIMATOLOGY_WINDOW_DAYS", 7))
+
+    # Horizonte completo de previsões por célula (arquivos Arrow)
+    FORECAST_STORE_DIR = os.getenv("FORECAST_STORE_DIR", os.path.join("cache", "forecasts"))
+    FORECAST_HORIZON_HOURS = int(os.getenv("FORECAST_HORIZON_HOURS", 2920))
+    FORECAST_STORE_ASYNC = os.getenv("FORECAST_STORE_ASYNC", "1") == "1"
+    PREDICT_CHUNK = int(os.getenv("PREDICT_CHUNK", 5000))
+
+    # Motor de previsão: "prophet" ou "harmonic" (regressão harmônica em NumPy)
+    FORECAST_ENGINE = os.getenv("FORECAST_ENGINE", "prophet")
+
+    # Modelos globais por região (shards de GLOBAL_SHARD_DEG graus)
+    GLOBAL_SHARD_DEG = float(os.getenv("GLOBAL_SHARD_DEG", 10))
+    GLOBAL_MODEL_SERVING = os.getenv("GLOBAL_MODEL_SERVING", "0") == "1"
+    GLOBAL_WORKERS = int(os.getenv("GLOBAL_WORKERS", 2))
+    GLOBAL_CHUNK_CELLS = int(os.getenv("GLOBAL_CHUNK_CELLS", 50))
+    GLOBAL_MAX_CELLS = int(os.getenv("GLOBAL_MAX_CELLS", 200))
+    GLOBAL_MAX_ROWS = int(os.getenv("GLOBAL_MAX_ROWS", 200000))
+
+    # Pool de processos de treino/previsão (0 = roda no próprio processo)
+    TRAINING_WORKERS = int(os.getenv("TRAINING_WORKERS", 5))
+    TRAINING_MP_CONTEXT = os.getenv("TRAINING_MP_CONTEXT", "spawn")
+    TRAINING_SEED = int(os.getenv("TRAINING_SEED", 0))
+
+    # Jobs assíncronos do /api/jobs
+    JOB_WORKERS = int(os.getenv("JOB_WORKERS", 2))
+    JOB_TTL = float(os.getenv("JOB_TTL", 3600))
+
+    # Intervalo (s) do refresh incremental em segundo plano; 0 desativa
+    REFRESH_INTERVAL = float(os.getenv("REFRESH_INTERVAL", 0))
     
     # Giovanni API Token
-    GIOVANNI_TOKEN = os.getenv("TOKEN")
\ No newline at end of file
+    GIOVANNI_TOKEN = os.getenv("TOKEN")
+    GIOVANNI_URL = os.getenv("GIOVANNI_URL", "https://api.giovanni.earthdata.nasa.gov/timeseries")
+
+    # Cache local das séries temporais do Giovanni
+    # Janela coletada; o fim avança conforme o refresh detecta dados novos
+    GIOVANNI_TIME_START = os.getenv("GIOVANNI_TIME_START", "2020-01-01T00:00:00")
+    GIOVANNI_TIME_END = os.getenv("GIOVANNI_TIME_END", "2025-09-28T00:00:00")
+    GIOVANNI_CACHE_DIR = os.getenv("GIOVANNI_CACHE_DIR", os.path.join("cache", "giovanni"))
+
+    # Cliente HTTP do Giovanni (compartilhado por todas as threads do processo)
+    GIOVANNI_MAX_CONCURRENCY = int(os.getenv("GIOVANNI_MAX_CONCURRENCY", 5))
+    GIOVANNI_RATE_PER_SEC = float(os.getenv("GIOVANNI_RATE_PER_SEC", 2))
+    GIOVANNI_BURST = int(os.getenv("GIOVANNI_BURST", 5))
+    GIOVANNI_FETCH_WORKERS = int(os.getenv("GIOVANNI_FETCH_WORKERS", 10))
+    GIOVANNI_RETRIES = int(os.getenv("GIOVANNI_RETRIES", 4))
+    GIOVANNI_BACKOFF = float(os.getenv("GIOVANNI_BACKOFF", 1.0))
+    GIOVANNI_TIMEOUT = float(os.getenv("GIOVANNI_TIMEOUT", 300))
\ No newline at end of file
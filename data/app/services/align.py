@@ -0,0 +1,75 @@
+import numpy as np
+import pandas as pd
+
+# Políticas de valores faltantes aceitas por align_series:
+#   'inner' - mantém só os timestamps presentes em todas as séries
+#   'left'  - mantém os timestamps da primeira série; os faltantes nas demais viram NaN
+#   'outer' - união de todos os timestamps; faltantes viram NaN
+MISSING_POLICIES = ("inner", "left", "outer")
+
+
+def _timestamps(df):
+    return df["Timestamp"].to_numpy(dtype="datetime64[ns]")
+
+
+def align_series(frames, how="inner", lat=None, lon=None):
+    """
+    Alinha várias séries num único DataFrame indexado por um só eixo de tempo.
+
+    Cada DataFrame de `frames` deve ter a coluna 'Timestamp' e uma ou mais
+    colunas de valores. O resultado é alocado uma única vez e as colunas
+    seguem a ordem de `frames`, independentemente da ordem em que as séries
+    ficaram prontas. A localização vai para `df.attrs` em vez de colunas
+    repetidas em todas as linhas.
+
+    Args:
+        frames (list[pd.DataFrame]): Séries a alinhar, na ordem desejada
+        how (str): Política de faltantes, uma de MISSING_POLICIES
+        lat (float|None): Latitude da série
+        lon (float|None): Longitude da série
+    Returns:
+        pd.DataFrame: ['Timestamp', <colunas de valores...>], com attrs lat/lon
+    """
+    if how not in MISSING_POLICIES:
+        raise ValueError(f"Política de faltantes inválida: {how!r}. Use uma de {MISSING_POLICIES}")
+
+    frames = [df for df in frames if not df.empty]
+    value_columns = [[c for c in df.columns if c not in ("Timestamp", "lat", "lon")] for df in frames]
+    columns = [c for cols in value_columns for c in cols]
+
+    if not frames:
+        index = np.array([], dtype="datetime64[ns]")
+    elif how == "inner":
+        index = _timestamps(frames[0])
+        for df in frames[1:]:
+            index = np.intersect1d(index, _timestamps(df))
+        index = np.unique(index)
+    elif how == "left":
+        index = np.unique(_timestamps(frames[0]))
+    else:
+        index = np.unique(np.concatenate([_timestamps(df) for df in frames]))
+
+    index = pd.DatetimeIndex(index)
+    dtypes = [df[c].dtype for df, cols in zip(frames, value_columns) for c in cols]
+    dtype = np.result_type(*dtypes) if dtypes else np.float32
+    values = np.full((len(index), len(columns)), np.nan, dtype=dtype)
+
+    start = 0
+    for df, cols in zip(frames, value_columns):
+        pos = index.get_indexer(df["Timestamp"])
+        found = pos >= 0
+        values[pos[found], start:start + len(cols)] = df[cols].to_numpy()[found]
+        start += len(cols)
+
+    df_aligned = pd.DataFrame(values, columns=columns, copy=False)
+    df_aligned.insert(0, "Timestamp", index)
+    df_aligned.attrs["lat"] = lat
+    df_aligned.attrs["lon"] = lon
+    return df_aligned
+
+
+def frame_location(df):
+    """Retorna (lat, lon) de um DataFrame produzido pelo pipeline."""
+    if df.attrs.get("lat") is not None:
+        return df.attrs["lat"], df.attrs["lon"]
+    return df["lat"].iloc[0], df["lon"].iloc[0]
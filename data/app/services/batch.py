@@ -0,0 +1,136 @@
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+from app.config_env import Config
+from app.services import forecast_store, tracing
+from app.services.forecast_cache import buscar_previsao, guardar_previsao
+from app.services.store_forecast import salvar_previsao_no_banco
+from app.services.modelos import janela_previsao, build_forecast_json, prever_celula
+from app.services.pipeline import carregar_historico
+from app.utils.grid import snap_to_grid
+
+
+def agrupar_consultas(consultas):
+    """
+    Agrupa as consultas por célula da grade.
+
+    Args:
+        consultas (list[dict]): Cada uma com 'lat', 'lon', 'datetime' e,
+            opcionalmente, a janela 'start'/'end'
+    Returns:
+        dict: (lat, lon) da célula -> [(índice, consulta, instantes da janela)]
+    Raises:
+        ValueError: Consulta sem um parâmetro obrigatório ou com valor inválido
+    """
+    grupos = {}
+    for indice, consulta in enumerate(consultas):
+        try:
+            celula = snap_to_grid(consulta['lat'], consulta['lon'])
+            janela = janela_previsao(consulta['datetime'], consulta.get('start'), consulta.get('end'))
+        except KeyError as e:
+            raise ValueError(f"query {indice}: missing required parameter {e}")
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"query {indice}: {e}")
+        grupos.setdefault(celula, []).append((indice, consulta, janela))
+    return grupos
+
+
+def _recortar(df_forecast, instantes):
+    """Linhas de `df_forecast` nos `instantes` (todos presentes nele)."""
+    posicoes = pd.DatetimeIndex(df_forecast['ds']).get_indexer(instantes)
+    return df_forecast.iloc[posicoes].reset_index(drop=True)
+
+
+def _padrao(consulta, intervalos):
+    # Só o modo padrão (dia inteiro, com intervalos) fica no cache de previsões
+    return intervalos and consulta.get('start') is None and consulta.get('end') is None
+
+
+def prever_grupo(celula, itens, intervalos=True):
+    """
+    Atende todas as consultas de uma célula com uma única passada: previsões
+    já em cache saem direto; para o resto, os modelos são carregados (ou
+    treinados) uma vez e preveem a união dos instantes pedidos, que é então
+    recortada por consulta.
+
+    Returns:
+        dict: índice da consulta -> (JSON da previsão, se veio do cache), ou a
+        exceção da consulta, se só ela falhou (ex: horário fora da janela)
+    """
+    lat, lon = celula
+    resultados = {}
+    pendentes = []
+    for indice, consulta, janela in itens:
+        cached = buscar_previsao(lat, lon, consulta['datetime']) if _padrao(consulta, intervalos) else None
+        if cached is not None:
+            resultados[indice] = (cached, True)
+        else:
+            pendentes.append((indice, consulta, janela))
+    if not pendentes:
+        return resultados
+
+    instantes = pd.DatetimeIndex(np.unique(np.concatenate([janela.values for _, _, janela in pendentes])))
+    with tracing.span("batch_cell", queries=len(pendentes), hours=len(instantes)):
+        # O horizonte gravado é lido como um trecho contíguo e recortado depois
+        forecasts = forecast_store.ler_janela(
+            lat, lon, pd.date_range(instantes[0], instantes[-1], freq='H'), intervalos
+        )
+        cached = forecasts is not None
+        if cached:
+            forecasts = {tipo: _recortar(df, instantes) for tipo, df in forecasts.items()}
+        else:
+            forecasts = prever_celula(carregar_historico(lat, lon), instantes, intervalos)
+
+        with tracing.span("json_build"):
+            for indice, consulta, janela in pendentes:
+                try:
+                    recorte = {tipo: _recortar(df, janela) for tipo, df in forecasts.items()}
+                    forecast = build_forecast_json(consulta['datetime'], recorte, lat, lon)
+                except ValueError as e:
+                    resultados[indice] = e
+                    continue
+                if _padrao(consulta, intervalos):
+                    # Como em executar_pipeline: o que acabou de ser previsto
+                    # também vai para a tabela 'previsoes'; o que veio do
+                    # horizonte gravado já está em disco
+                    if not cached:
+                        with tracing.span("forecast_save"):
+                            salvar_previsao_no_banco(lat, lon, consulta['datetime'], forecast)
+                    guardar_previsao(lat, lon, consulta['datetime'], forecast)
+                resultados[indice] = (forecast, cached)
+    return resultados
+
+
+def executar_lote(consultas, intervalos=True):
+    """
+    Previsões para uma lista de consultas (lat, lon, datetime[, start, end]).
+    As consultas são agrupadas por célula da grade, e cada célula coleta,
+    carrega ou treina e prevê uma única vez; células diferentes rodam em
+    paralelo (até BATCH_WORKERS).
+
+    Returns:
+        list[dict]: Um item por consulta, na mesma ordem: 'grid_cell' e
+        'cached'/'data', ou 'error' se a consulta (ou a célula toda) falhou
+    Raises:
+        ValueError: Alguma consulta é inválida (nada é executado)
+    """
+    grupos = agrupar_consultas(consultas)
+    saida = [None] * len(consultas)
+
+    def executar(celula, itens):
+        try:
+            for indice, resultado in prever_grupo(celula, itens, intervalos).items():
+                if isinstance(resultado, Exception):
+                    saida[indice] = {"grid_cell": {"lat": celula[0], "lon": celula[1]}, "error": str(resultado)}
+                else:
+                    forecast, cached = resultado
+                    saida[indice] = {"grid_cell": {"lat": celula[0], "lon": celula[1]}, "cached": cached, "data": forecast}
+        except Exception as e:
+            print(f"Erro no lote para a célula {celula[0]},{celula[1]}: {e}")
+            for indice, _, _ in itens:
+                saida[indice] = {"grid_cell": {"lat": celula[0], "lon": celula[1]}, "error": str(e)}
+
+    with tracing.span("batch", queries=len(consultas), cells=len(grupos)):
+        with ThreadPoolExecutor(max_workers=max(1, min(Config.BATCH_WORKERS, len(grupos)))) as executor:
+            list(executor.map(lambda item: executar(*item), grupos.items()))
+    return saida
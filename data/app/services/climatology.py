@@ -0,0 +1,229 @@
+import os
+import json
+import threading
+import numpy as np
+import pandas as pd
+from app.config_env import Config
+from app.services import history_store
+from app.services.training_executor import VARIAVEIS
+from app.services.modelos import ler_data
+from app.utils.grid import snap_to_grid
+
+PERCENTIS = (5, 10, 25, 50, 75, 90, 95)
+
+# Limiares de excedência por variável: (rótulo, valor nas unidades do
+# histórico transformado: °C, kg/kg, km/h, kg m-2 s-1 e kg m-2).
+LIMIARES = {
+    "temperature": (("0 °C", 0.0), ("30 °C", 30.0), ("35 °C", 35.0)),
+    "humidity": (("15 g/kg", 0.015), ("20 g/kg", 0.020)),
+    "wind_speed": (("20 km/h", 20.0), ("40 km/h", 40.0), ("60 km/h", 60.0)),
+    "rain": (("0.1 mm/h", 0.1 / 3600), ("1 mm/h", 1.0 / 3600), ("5 mm/h", 5.0 / 3600), ("10 mm/h", 10.0 / 3600)),
+    "water_vapor": (("40 kg/m²", 40.0), ("50 kg/m²", 50.0)),
+}
+
+DIAS_ANO = 366
+
+# Probabilidade (em %) gravada nos dias/horas sem nenhuma amostra da variável
+SEM_AMOSTRAS = 255
+
+_locks = {}
+_locks_guard = threading.Lock()
+
+
+def _lock_para(chave):
+    with _locks_guard:
+        lock = _locks.get(chave)
+        if lock is None:
+            lock = _locks[chave] = threading.Lock()
+        return lock
+
+
+def _pasta(lat, lon):
+    return os.path.join(Config.CLIMATOLOGY_DIR, f"{float(lat):.4f}_{float(lon):.4f}")
+
+
+def _indices_janela(dia_do_ano, janela):
+    """
+    Para cada dia do ano (linhas), os índices dos dias do histórico a até
+    `janela` dias de distância (circular), completados com -1.
+    """
+    alvos = np.arange(1, DIAS_ANO + 1)
+    distancia = np.abs(alvos[:, None] - dia_do_ano[None, :])
+    distancia = np.minimum(distancia, DIAS_ANO - distancia)
+    dentro = distancia <= janela
+    largura = dentro.sum(axis=1).max()
+    indices = np.full((DIAS_ANO, largura), -1)
+    for linha, mascara in enumerate(dentro):
+        selecionados = np.flatnonzero(mascara)
+        indices[linha, :len(selecionados)] = selecionados
+    return indices
+
+
+def _percentis(valores, contagem):
+    """
+    Percentis ao longo do eixo 1 ignorando NaN (interpolação linear, como o
+    np.nanpercentile), com uma única ordenação em vez de uma por célula.
+    """
+    ordenados = np.sort(np.where(np.isnan(valores), np.inf, valores), axis=1)
+    resultado = []
+    for p in PERCENTIS:
+        posicao = np.maximum(contagem - 1, 0) * (p / 100)
+        abaixo = np.floor(posicao).astype(np.int64)
+        acima = np.minimum(abaixo + 1, np.maximum(contagem - 1, 0))
+        v_abaixo = np.take_along_axis(ordenados, abaixo[:, None, :], axis=1)[:, 0]
+        v_acima = np.take_along_axis(ordenados, acima[:, None, :], axis=1)[:, 0]
+        # Sem amostras, os dois vizinhos são o +inf de preenchimento (descartado abaixo)
+        with np.errstate(invalid='ignore'):
+            valor = v_abaixo + (v_acima - v_abaixo) * (posicao - abaixo)
+        resultado.append(np.where(contagem > 0, valor, np.nan))
+    return np.stack(resultado, axis=-1)
+
+
+def calcular_climatologia(df_local, janela=None):
+    """
+    Distribuição histórica de cada variável por (dia do ano, hora local),
+    usando as amostras de todos os anos num intervalo de ±`janela` dias.
+
+    Returns:
+        tuple: (percentis float32 [variável, dia, hora, percentil],
+                probabilidades uint8 em % [limiar, dia, hora] (SEM_AMOSTRAS sem dados),
+                amostras uint16 [dia, hora])
+    """
+    janela = Config.CLIMATOLOGY_WINDOW_DAYS if janela is None else janela
+    tempo = pd.DatetimeIndex(df_local['Timestamp_Local'])
+    validos = ~tempo.isna()
+    tempo = tempo[validos]
+
+    # Uma linha por dia local e uma coluna por hora (no horário de verão, a hora repetida é sobrescrita)
+    dias = tempo.normalize()
+    primeiro = dias.min()
+    indice_dia = ((dias - primeiro) // pd.Timedelta(days=1)).to_numpy()
+    horas = tempo.hour.to_numpy()
+    n_dias = int(indice_dia.max()) + 1
+    dia_do_ano = pd.date_range(primeiro, periods=n_dias, freq='D').dayofyear.to_numpy()
+    indices = _indices_janela(dia_do_ano, janela)
+    preenchido = indices >= 0
+
+    percentis = np.empty((len(VARIAVEIS), DIAS_ANO, 24, len(PERCENTIS)), dtype=np.float32)
+    probabilidades = []
+    amostras = None
+    for i, (tipo, coluna) in enumerate(VARIAVEIS.items()):
+        matriz = np.full((n_dias, 24), np.nan)
+        matriz[indice_dia, horas] = df_local[coluna].to_numpy(dtype=np.float64)[validos]
+        # [dia do ano, amostra da janela, hora]
+        janela_valores = np.where(preenchido[:, :, None], matriz[indices], np.nan)
+        contagem = (~np.isnan(janela_valores)).sum(axis=1)
+        if amostras is None:
+            amostras = contagem.astype(np.uint16)
+
+        percentis[i] = _percentis(janela_valores, contagem)
+        for _, limiar in LIMIARES[tipo]:
+            excede = (janela_valores > limiar).sum(axis=1)
+            probabilidade = np.round(100 * excede / np.maximum(contagem, 1))
+            probabilidades.append(np.where(contagem > 0, probabilidade, SEM_AMOSTRAS).astype(np.uint8))
+    return percentis, np.stack(probabilidades), amostras
+
+
+def gravar_climatologia(lat, lon, tabelas, versao=''):
+    pasta = _pasta(lat, lon)
+    os.makedirs(pasta, exist_ok=True)
+    sufixo = f".{os.getpid()}.{threading.get_ident()}.tmp"
+    for nome, tabela in zip(("percentis", "probabilidades", "amostras"), tabelas):
+        with open(os.path.join(pasta, f"{nome}.npy{sufixo}"), "wb") as f:
+            np.save(f, tabela)
+    with open(os.path.join(pasta, f"meta.json{sufixo}"), "w") as f:
+        json.dump({
+            "versao": versao,
+            "janela": Config.CLIMATOLOGY_WINDOW_DAYS,
+            "variaveis": list(VARIAVEIS),
+            "percentis": list(PERCENTIS),
+            "limiares": [[tipo, rotulo, valor] for tipo in VARIAVEIS for rotulo, valor in LIMIARES[tipo]],
+        }, f)
+    # meta.json por último: ele é a marca de que as tabelas estão completas
+    for nome in ("percentis.npy", "probabilidades.npy", "amostras.npy", "meta.json"):
+        os.replace(os.path.join(pasta, nome + sufixo), os.path.join(pasta, nome))
+
+
+def _versao_historico(lat, lon):
+    ultimo = history_store.ultimo(lat, lon)
+    return None if ultimo is None else ultimo.strftime('%Y%m%d%H')
+
+
+def atualizar_climatologia(lat, lon, forcar=False):
+    """
+    (Re)calcula as tabelas da célula a partir do histórico local, se ele
+    mudou desde o último cálculo.
+
+    Returns:
+        bool: Se as tabelas da célula existem ao final
+    """
+    with _lock_para((round(float(lat), 4), round(float(lon), 4))):
+        versao = _versao_historico(lat, lon)
+        if versao is None:
+            return False
+        meta = _ler_meta(lat, lon)
+        if not forcar and meta is not None and meta["versao"] == versao:
+            return True
+        gravar_climatologia(lat, lon, calcular_climatologia(history_store.ler(lat, lon)), versao)
+        return True
+
+
+def _ler_meta(lat, lon):
+    try:
+        with open(os.path.join(_pasta(lat, lon), "meta.json")) as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def consultar(lat, lon, date):
+    """
+    Percentis e probabilidades de excedência da célula no dia do ano e hora
+    local de `date`. As tabelas são lidas por memory-map, então a consulta só
+    toca as posições pedidas. Calcula as tabelas na hora se a célula tem
+    histórico mas ainda não tem climatologia.
+
+    Returns:
+        dict ou None: Se a célula não tem histórico local
+    Raises:
+        ValueError: Coordenadas ou data inválidas
+    """
+    lat, lon = snap_to_grid(lat, lon)
+    momento = ler_data(date)
+    meta = _ler_meta(lat, lon)
+    if meta is None:
+        if not atualizar_climatologia(lat, lon):
+            return None
+        meta = _ler_meta(lat, lon)
+
+    pasta = _pasta(lat, lon)
+    percentis = np.load(os.path.join(pasta, "percentis.npy"), mmap_mode='r')
+    probabilidades = np.load(os.path.join(pasta, "probabilidades.npy"), mmap_mode='r')
+    amostras = np.load(os.path.join(pasta, "amostras.npy"), mmap_mode='r')
+
+    dia, hora = momento.dayofyear - 1, momento.hour
+    variaveis = {
+        tipo: {
+            "percentiles": {
+                f"p{p}": None if np.isnan(v) else float(v)
+                for p, v in zip(meta["percentis"], percentis[i, dia, hora])
+            },
+            "exceedance": {},
+        }
+        for i, tipo in enumerate(meta["variaveis"])
+    }
+    for j, (tipo, rotulo, _) in enumerate(meta["limiares"]):
+        probabilidade = int(probabilidades[j, dia, hora])
+        variaveis[tipo]["exceedance"][rotulo] = None if probabilidade == SEM_AMOSTRAS else probabilidade / 100
+
+    return {
+        "lat": lat,
+        "lon": lon,
+        "datetime": momento.strftime('%Y-%m-%dT%H:%M:%S'),
+        "day_of_year": dia + 1,
+        "hour": hora,
+        "window_days": meta["janela"],
+        "samples": int(amostras[dia, hora]),
+        "history_version": meta["versao"],
+        "variables": variaveis,
+    }
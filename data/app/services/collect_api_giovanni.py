@@ -1,13 +1,19 @@
 import os
 import io
+import numpy as np
 import pandas as pd
-import requests
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import as_completed
 from tqdm import tqdm
 from ..config_env import Config
+from .giovanni_cache import get_cached_series
+from . import giovanni_client
+from .align import align_series
 
 
-TIME_SERIES_URL = "https://api.giovanni.earthdata.nasa.gov/timeseries"
+TIME_SERIES_URL = Config.GIOVANNI_URL
+# Formato fixo dos timestamps do CSV do Giovanni (ex: 2020-01-01T00:30:00)
+TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%S"
+HEADER_LINES = 13
 
 def call_time_series(lat, lon, time_start, time_end, data):
     query_parameters = {
@@ -16,47 +22,104 @@ def call_time_series(lat, lon, time_start, time_end, data):
         "time": f"{time_start}/{time_end}"
     }
     headers = {"Authorization": f"Bearer {Config.GIOVANNI_TOKEN}"}
-    response = requests.get(TIME_SERIES_URL, params=query_parameters, headers=headers)
-    response.raise_for_status()  # Raise an exception for bad status codes
-    return response.text
+    response = giovanni_client.get(TIME_SERIES_URL, params=query_parameters, headers=headers)
+    # Bytes crus: o parse_csv lê direto deles, sem montar uma str intermediária
+    return response.content
+
+def _parse_timestamps(values):
+    try:
+        return pd.to_datetime(values, format=TIMESTAMP_FORMAT)
+    except ValueError:
+        # Fallback para variações de ISO 8601 (ex: sufixo de fuso), ainda vetorizado
+        return pd.to_datetime(values, format="ISO8601")
 
 def parse_csv(ts):
-    with io.StringIO(ts) as f:
+    """
+    Interpreta o CSV de série temporal do Giovanni.
+
+    Aceita bytes, str ou um arquivo/stream já aberto. Os timestamps são
+    convertidos numa única passada vetorizada e os valores vêm em float32.
+    """
+    if isinstance(ts, (bytes, bytearray, memoryview)):
+        f = io.BytesIO(ts)
+    elif isinstance(ts, str):
+        f = io.StringIO(ts)
+    else:
+        f = ts
+
+    with f:
         headers = {}
-        for _ in range(13):
+        for _ in range(HEADER_LINES):
             line = f.readline()
+            if isinstance(line, bytes):
+                line = line.decode("utf-8")
             key, value = line.split(",", maxsplit=1)
             headers[key] = value.strip()
 
+        name = headers["param_short_name"]
         df = pd.read_csv(
             f,
             header=1,
-            names=("Timestamp", headers["param_short_name"]),
-            converters={"Timestamp": pd.to_datetime}
+            names=("Timestamp", name),
+            dtype={"Timestamp": str, name: np.float32},
+            engine="c"
         )
+    df["Timestamp"] = _parse_timestamps(df["Timestamp"])
     return headers, df
 
-def colect_variables(list_variables, lat, lon, time_start, time_end):
-    df_completed = pd.DataFrame()
+class ColetaIncompleta(RuntimeError):
+    """Alguma variável não pôde ser baixada do Giovanni (falha de rede, throttling, erro do serviço)."""
 
+
+def colect_variable_groups(groups, lat, lon, time_start, time_end, progress=None):
+    """
+    Coleta vários grupos de variáveis de uma vez: todas as variáveis de todos
+    os grupos são baixadas em paralelo no pool compartilhado, e o resultado é
+    uma lista de DataFrames alinhados (um por grupo, na ordem de `groups`),
+    com lat/lon em `df.attrs`. `progress(variavel, concluidas, total, erro)`,
+    se dado, é chamado a cada variável que termina (erro=None em caso de sucesso).
+
+    Raises:
+        ColetaIncompleta: Se alguma variável falhou (sem ela não há como alinhar a série)
+    """
     def process_variable(data):
-        ts = call_time_series(lat, lon, time_start, time_end, data)
-        _, df_new = parse_csv(ts)
-        return df_new
-
-    with ThreadPoolExecutor(max_workers=5) as executor:
-        future_to_df = {executor.submit(process_variable, data): data for data in list_variables}
-        for future in tqdm(as_completed(future_to_df), total=len(future_to_df), desc=f"Processing variables for {lat},{lon}"):
-            try:
-                df_new = future.result()
-                if df_completed.empty:
-                    df_completed = df_new
-                else:
-                    df_completed = pd.merge(df_completed, df_new, on="Timestamp", how="inner")
-                    
-            except Exception as e:
-                print(f"Error processing variable for {lat},{lon}: {e}")
-
-    df_completed['lat'] = lat
-    df_completed['lon'] = lon
-    return df_completed
+        def fetch(start, end):
+            ts = call_time_series(lat, lon, start, end, data)
+            _, df_new = parse_csv(ts)
+            return df_new
+        # Só os trechos que ainda não estão no cache em disco vão ao Giovanni
+        return get_cached_series(lat, lon, data, time_start, time_end, fetch)
+
+    executor = giovanni_client.get_executor()
+    future_to_variable = {
+        executor.submit(process_variable, data): data
+        for list_variables in groups
+        for data in list_variables
+    }
+
+    series = {}
+    falhas = {}
+    for concluidas, future in enumerate(tqdm(as_completed(future_to_variable), total=len(future_to_variable), desc=f"Processing variables for {lat},{lon}"), 1):
+        data = future_to_variable[future]
+        erro = None
+        try:
+            series[data] = future.result()
+        except Exception as e:
+            erro = str(e)
+            falhas[data] = e
+            print(f"Error processing variable {data} for {lat},{lon}: {e}")
+        if progress:
+            progress(data, concluidas, len(future_to_variable), erro)
+
+    if falhas:
+        data, e = next(iter(falhas.items()))
+        raise ColetaIncompleta(f"{len(falhas)} variable(s) failed for {lat},{lon}; {data}: {e}") from e
+
+    # Alinhamento único por grupo, na ordem das listas (e não na ordem de chegada)
+    return [
+        align_series([series[data] for data in list_variables if data in series], how="inner", lat=lat, lon=lon)
+        for list_variables in groups
+    ]
+
+def colect_variables(list_variables, lat, lon, time_start, time_end):
+    return colect_variable_groups([list_variables], lat, lon, time_start, time_end)[0]
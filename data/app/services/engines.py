@@ -0,0 +1,221 @@
+import copy
+from statistics import NormalDist
+import numpy as np
+import pandas as pd
+from prophet import Prophet
+from app.config_env import Config
+
+# Colunas da previsão devolvidas por todos os motores
+COLUNAS_PREVISAO = ['ds', 'yhat', 'yhat_lower', 'yhat_upper']
+
+# Sazonalidades do modelo (nome, período em dias, ordem de Fourier): as mesmas
+# que o Prophet usa com a configuração de criar_prophet.
+SAZONALIDADES = (
+    ('daily', 1.0, 4),
+    ('weekly', 7.0, 3),
+    ('yearly', 365.25, 10),
+    ('mensal', 30.5, 5),
+    ('diaria', 24.0, 10),
+)
+INTERVAL_WIDTH = 0.95
+
+
+def criar_prophet(regressores=()):
+    modelo = Prophet(
+        interval_width=INTERVAL_WIDTH,
+        seasonality_mode='multiplicative',
+        daily_seasonality=True,
+        weekly_seasonality=True,
+        yearly_seasonality=True
+    )
+    modelo.add_seasonality(name='mensal', period=30.5, fourier_order=5)
+    modelo.add_seasonality(name='diaria', period=24, fourier_order=10)
+    for regressor in regressores:
+        modelo.add_regressor(regressor)
+    return modelo
+
+
+def warm_start_params(modelo):
+    """Parâmetros de um Prophet já treinado, no formato de `fit(..., init=...)`."""
+    params = {}
+    for nome in ['k', 'm', 'sigma_obs']:
+        params[nome] = modelo.params[nome][0][0]
+    for nome in ['delta', 'beta']:
+        params[nome] = modelo.params[nome][0]
+    return params
+
+
+class MotorPrevisao:
+    """
+    Interface dos motores de previsão. Um motor treina um modelo a partir de
+    arrays (ds, y) e prevê instantes arbitrários com ele. `regressores`
+    ({nome: array}, alinhado com ds/future_ds) são variáveis explicativas
+    extras, como lat/lon nos modelos globais.
+
+    `vetorizado` indica que treinar_lote resolve várias séries de uma vez, de
+    forma barata o bastante para rodar no próprio processo, sem o pool.
+    """
+    nome = None
+    vetorizado = False
+
+    def treinar(self, ds, y, modelo_base=None, regressores=None):
+        raise NotImplementedError
+
+    def treinar_lote(self, ds, Y, modelos_base=None, regressores=None):
+        """Treina uma série por coluna de Y, todas com os instantes `ds`."""
+        modelos_base = modelos_base or [None] * Y.shape[1]
+        return [self.treinar(ds, Y[:, j], modelos_base[j], regressores) for j in range(Y.shape[1])]
+
+    def prever(self, modelo, future_ds, intervalos=True, regressores=None):
+        raise NotImplementedError
+
+
+class MotorProphet(MotorPrevisao):
+    nome = 'prophet'
+
+    def treinar(self, ds, y, modelo_base=None, regressores=None):
+        regressores = regressores or {}
+        modelo = criar_prophet(tuple(regressores))
+        kwargs = {'init': warm_start_params(modelo_base)} if isinstance(modelo_base, Prophet) else {}
+        modelo.fit(pd.DataFrame({'ds': ds, 'y': y, **regressores}), **kwargs)
+        return modelo
+
+    def prever(self, modelo, future_ds, intervalos=True, regressores=None):
+        """
+        Sem `intervalos`, pula a amostragem de incerteza e devolve apenas
+        ds/yhat. Janelas longas são previstas em lotes de PREDICT_CHUNK linhas
+        para limitar o pico de memória.
+        """
+        if not intervalos and modelo.uncertainty_samples:
+            # Cópia rasa: o modelo pode estar compartilhado pelo registro entre threads
+            modelo = copy.copy(modelo)
+            modelo.uncertainty_samples = 0
+        colunas = COLUNAS_PREVISAO if intervalos else ['ds', 'yhat']
+        future = pd.DataFrame({'ds': future_ds, **(regressores or {})})
+        lotes = [
+            modelo.predict(future.iloc[i:i + Config.PREDICT_CHUNK])[colunas]
+            for i in range(0, len(future), Config.PREDICT_CHUNK)
+        ]
+        return pd.concat(lotes, ignore_index=True)
+
+
+class ModeloHarmonico:
+    """Coeficientes de uma regressão harmônica já ajustada."""
+
+    def __init__(self, t0, escala, periodos, regressores, coef, sigma):
+        self.t0 = t0            # instante de referência (ns)
+        self.escala = escala    # duração do histórico em dias, para a tendência
+        self.periodos = periodos  # sazonalidades usadas: ((período, ordem), ...)
+        self.regressores = regressores  # ((nome, média, desvio), ...)
+        self.coef = coef        # float64 (p,)
+        self.sigma = sigma      # desvio padrão dos resíduos
+
+
+def _dias(ds, t0):
+    ds = np.asarray(ds, dtype='datetime64[ns]').view(np.int64)
+    return (ds - t0) / 86400e9
+
+
+def periodos_ajustaveis(escala):
+    """
+    Sazonalidades que o histórico consegue estimar: o período precisa caber
+    pelo menos duas vezes nele. Com menos que isso a sazonalidade se confunde
+    com a tendência e explode ao extrapolar.
+    """
+    return tuple((periodo, ordem) for _, periodo, ordem in SAZONALIDADES if 2 * periodo <= escala)
+
+
+def matriz_harmonica(t, escala, periodos, regressores=(), valores=None):
+    """
+    Matriz de regressão: intercepto, tendência linear, os pares seno/cosseno
+    de cada sazonalidade (para os tempos `t` em dias) e os regressores extras
+    padronizados.
+    """
+    colunas = [np.ones_like(t), t / escala]
+    for periodo, ordem in periodos:
+        angulos = np.outer(2 * np.pi * t / periodo, np.arange(1, ordem + 1))
+        colunas.append(np.sin(angulos))
+        colunas.append(np.cos(angulos))
+    for nome, media, desvio in regressores:
+        colunas.append((np.asarray(valores[nome], dtype=np.float64) - media) / desvio)
+    return np.column_stack(colunas)
+
+
+class MotorHarmonico(MotorPrevisao):
+    """
+    Regressão harmônica por mínimos quadrados com as mesmas sazonalidades de
+    Fourier do Prophet, em modo aditivo e com tendência linear (sem pontos de
+    mudança). Todas as séries com os mesmos instantes compartilham uma única
+    matriz de regressão e são resolvidas num só sistema.
+    """
+    nome = 'harmonic'
+    vetorizado = True
+
+    def __init__(self, ridge=1e-4):
+        self.ridge = ridge
+
+    def treinar(self, ds, y, modelo_base=None, regressores=None):
+        return self.treinar_lote(ds, np.asarray(y, dtype=np.float64)[:, None], regressores=regressores)[0]
+
+    def treinar_lote(self, ds, Y, modelos_base=None, regressores=None):
+        Y = np.asarray(Y, dtype=np.float64)
+        t0 = int(np.asarray(ds, dtype='datetime64[ns]').view(np.int64).min())
+        t = _dias(ds, t0)
+        escala = max(float(t.max()), 1.0)
+        periodos = periodos_ajustaveis(escala)
+        regressores = regressores or {}
+        estatisticas = tuple(
+            (nome, float(np.mean(valores)), float(np.std(valores)) or 1.0)
+            for nome, valores in regressores.items()
+        )
+        X = matriz_harmonica(t, escala, periodos, estatisticas, regressores)
+
+        # Séries com buracos: linhas com NaN são ignoradas coluna a coluna
+        validos = ~np.isnan(Y)
+        if validos.all():
+            coefs = self._resolver(X, Y)
+            residuos = Y - X @ coefs
+            sigmas = residuos.std(axis=0)
+            return [ModeloHarmonico(t0, escala, periodos, estatisticas, coefs[:, j], sigmas[j]) for j in range(Y.shape[1])]
+        modelos = []
+        for j in range(Y.shape[1]):
+            Xj, yj = X[validos[:, j]], Y[validos[:, j], j:j + 1]
+            coef = self._resolver(Xj, yj)
+            modelos.append(ModeloHarmonico(t0, escala, periodos, estatisticas, coef[:, 0], float((yj - Xj @ coef).std())))
+        return modelos
+
+    def _resolver(self, X, Y):
+        # Equações normais com uma regularização mínima: XᵀX é p×p (p ≈ 66) e
+        # é fatorado uma vez para todas as colunas de Y.
+        XtX = X.T @ X
+        XtX[np.diag_indices_from(XtX)] += self.ridge * np.trace(XtX) / len(XtX)
+        return np.linalg.solve(XtX, X.T @ Y)
+
+    def prever(self, modelo, future_ds, intervalos=True, regressores=None):
+        X = matriz_harmonica(
+            _dias(future_ds, modelo.t0), modelo.escala, modelo.periodos, modelo.regressores, regressores
+        )
+        yhat = X @ modelo.coef
+        forecast = pd.DataFrame({'ds': pd.DatetimeIndex(future_ds), 'yhat': yhat})
+        if intervalos:
+            # Intervalo normal com a mesma largura do Prophet
+            z = NormalDist().inv_cdf(0.5 + INTERVAL_WIDTH / 2)
+            forecast['yhat_lower'] = yhat - z * modelo.sigma
+            forecast['yhat_upper'] = yhat + z * modelo.sigma
+        return forecast
+
+
+MOTORES = {motor.nome: motor for motor in (MotorProphet(), MotorHarmonico())}
+
+
+def get_motor(nome=None):
+    """Motor configurado em FORECAST_ENGINE (ou o de nome `nome`)."""
+    nome = nome or Config.FORECAST_ENGINE
+    if nome not in MOTORES:
+        raise ValueError(f"Motor de previsão desconhecido: {nome}")
+    return MOTORES[nome]
+
+
+def motor_do_modelo(modelo):
+    """Motor capaz de prever com um modelo já treinado (de qualquer motor)."""
+    return MOTORES['harmonic'] if isinstance(modelo, ModeloHarmonico) else MOTORES['prophet']
@@ -0,0 +1,96 @@
+import time
+import threading
+from collections import OrderedDict
+import pandas as pd
+from app.config_env import Config
+from app.services.store_forecast import buscar_previsao_no_banco, apagar_previsoes_no_banco
+from app.services import forecast_store, tracing
+
+
+class TTLCache:
+    """LRU em memória com expiração por tempo, segura para várias threads."""
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._dados = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, chave):
+        with self._lock:
+            item = self._dados.get(chave)
+            if item is None:
+                return None
+            expira_em, valor = item
+            if expira_em < time.monotonic():
+                del self._dados[chave]
+                return None
+            self._dados.move_to_end(chave)
+            return valor
+
+    def put(self, chave, valor):
+        with self._lock:
+            self._dados[chave] = (time.monotonic() + self.ttl, valor)
+            self._dados.move_to_end(chave)
+            while len(self._dados) > self.maxsize:
+                self._dados.popitem(last=False)
+
+    def remove_where(self, predicado):
+        with self._lock:
+            for chave in [c for c in self._dados if predicado(c)]:
+                del self._dados[chave]
+
+    def clear(self):
+        with self._lock:
+            self._dados.clear()
+
+
+_memoria = TTLCache(Config.FORECAST_CACHE_SIZE, Config.FORECAST_CACHE_TTL)
+
+
+def _local(lat, lon):
+    return round(float(lat), 4), round(float(lon), 4)
+
+
+def _chave(lat, lon, date):
+    return _local(lat, lon) + (pd.Timestamp(date).isoformat(),)
+
+
+def _contar(camada, acerto):
+    tracing.incrementar("app_cache_requests_total", ajuda="Consultas aos caches, por resultado",
+                        cache=camada, result="hit" if acerto else "miss")
+
+
+def buscar_previsao(lat, lon, date):
+    """
+    Busca uma previsão já calculada, primeiro na memória do processo e depois
+    na tabela 'previsoes'. Retorna None se nenhuma das camadas tiver o resultado.
+    """
+    chave = _chave(lat, lon, date)
+    resultado = _memoria.get(chave)
+    _contar("memory", resultado is not None)
+    if resultado is not None:
+        return resultado
+
+    with tracing.span("db_forecast_lookup"):
+        resultado = buscar_previsao_no_banco(lat, lon, pd.Timestamp(date).to_pydatetime())
+    _contar("database", resultado is not None)
+    if resultado is not None:
+        _memoria.put(chave, resultado)
+    return resultado
+
+
+def guardar_previsao(lat, lon, date, resultado):
+    """Guarda na memória uma previsão que acabou de ser calculada e salva no banco."""
+    _memoria.put(_chave(lat, lon, date), resultado)
+
+
+def invalidar_localizacao(lat, lon):
+    """
+    Descarta as previsões de uma localização em todas as camadas. Deve ser
+    chamada quando chegam dados novos ou um modelo é retreinado.
+    """
+    local = _local(lat, lon)
+    _memoria.remove_where(lambda chave: chave[:2] == local)
+    apagar_previsoes_no_banco(lat, lon)
+    forecast_store.apagar(lat, lon)
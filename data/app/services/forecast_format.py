@@ -0,0 +1,108 @@
+import zlib
+import numpy as np
+import orjson
+from app.config_env import Config
+
+# Passo do eixo de tempo das janelas previstas (janela_previsao é horária)
+PASSO_S = 3600
+
+
+def arredondar(valores, digitos=None):
+    """Arredonda para `digitos` algarismos significativos (NaN/inf passam direto)."""
+    digitos = Config.FORECAST_SIGNIFICANT_DIGITS if digitos is None else digitos
+    v = np.asarray(valores, dtype=np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        magnitude = np.floor(np.log10(np.abs(v)))
+    magnitude = np.where(np.isfinite(magnitude), magnitude, 0)
+    fator = 10.0 ** (digitos - 1 - magnitude)
+    return np.where(np.isfinite(v), np.round(v * fator) / fator, v)
+
+
+def _eixo(timestamps):
+    """{'start', 'step_s', 'count'} de uma série regular; senão, os instantes explícitos."""
+    instantes = np.array(timestamps, dtype='datetime64[s]')
+    if len(instantes) > 1 and not (np.diff(instantes) == np.timedelta64(PASSO_S, 's')).all():
+        return {"timestamps": np.datetime_as_string(instantes).tolist()}
+    inicio = str(np.datetime_as_string(instantes[0])) if len(instantes) else None
+    return {"start": inicio, "step_s": PASSO_S, "count": len(instantes)}
+
+
+def _instantes(eixo):
+    if "timestamps" in eixo:
+        return np.array(eixo["timestamps"], dtype='datetime64[s]')
+    return np.datetime64(eixo["start"], 's') + np.arange(eixo["count"]) * np.timedelta64(eixo["step_s"], 's')
+
+
+def compactar_bloco(bloco, exato=False):
+    """
+    Bloco compacto de uma variável (build_variable_json), com o próprio eixo
+    em 'time'. Com `exato`, os valores não são arredondados.
+    """
+    intervalo = bloco.get('interval_90')
+    valores = bloco['series']['values']
+    if exato:
+        return {
+            "predicted": bloco['predicted'],
+            "interval_90": intervalo,
+            "values": valores,
+            "time": _eixo(bloco['series']['timestamp']),
+        }
+    return {
+        "predicted": float(arredondar(bloco['predicted'])),
+        "interval_90": None if intervalo is None else arredondar(intervalo).tolist(),
+        "values": arredondar(valores).tolist(),
+        "time": _eixo(bloco['series']['timestamp']),
+    }
+
+
+def compactar(forecast, exato=False):
+    """
+    Versão compacta de um JSON de previsão (build_forecast_json): um eixo de
+    tempo (início + passo) compartilhado pelas variáveis no lugar das listas
+    de horários, e valores com FORECAST_SIGNIFICANT_DIGITS algarismos (ou
+    sem arredondamento, com `exato`). Variáveis com um eixo diferente do
+    compartilhado levam o próprio 'time'.
+    """
+    variaveis = {}
+    eixo = None
+    for tipo, bloco in forecast['forecast'].items():
+        variaveis[tipo] = compactar_bloco(bloco, exato)
+        if eixo is None:
+            eixo = variaveis[tipo]["time"]
+        if variaveis[tipo]["time"] == eixo:
+            del variaveis[tipo]["time"]
+    return {
+        "location": forecast['location'],
+        "timestamp": forecast['timestamp'],
+        "time": eixo,
+        "forecast": variaveis,
+    }
+
+
+def expandir(compacto):
+    """Inverso de `compactar`: volta ao formato de build_forecast_json."""
+    forecast = {}
+    for tipo, bloco in compacto['forecast'].items():
+        instantes = _instantes(bloco.get("time", compacto["time"]))
+        forecast[tipo] = {
+            "predicted": bloco["predicted"],
+            "interval_90": bloco["interval_90"],
+            "series": {
+                "timestamp": np.char.replace(np.datetime_as_string(instantes), "T", " ").tolist(),
+                "values": bloco["values"],
+            },
+        }
+    return {"location": compacto['location'], "timestamp": compacto['timestamp'], "forecast": forecast}
+
+
+def codificar(compacto):
+    """
+    Forma binária do JSON compacto (orjson + zlib). A tabela 'previsoes'
+    guarda a forma exata (compactar(..., exato=True)): expandida, ela devolve
+    os mesmos números da previsão recém-calculada.
+    """
+    return zlib.compress(orjson.dumps(compacto, option=orjson.OPT_SERIALIZE_NUMPY), 6)
+
+
+def decodificar(dados):
+    return orjson.loads(zlib.decompress(bytes(dados)))
@@ -0,0 +1,146 @@
+import os
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from app.config_env import Config
+from app.services.training_executor import executar_modelos
+
+PASSO = pd.Timedelta(hours=1)
+COLUNAS = ['yhat', 'yhat_lower', 'yhat_upper']
+
+_gravacoes = ThreadPoolExecutor(max_workers=1, thread_name_prefix="forecast-store")
+_lock = threading.Lock()
+
+
+def _caminho(lat, lon):
+    return os.path.join(Config.FORECAST_STORE_DIR, f"{float(lat):.4f}_{float(lon):.4f}.arrow")
+
+
+def gravar_horizonte(lat, lon, forecasts_dict, versao=''):
+    """
+    Grava o horizonte completo de previsões de uma célula num arquivo Arrow
+    IPC (uma coluna float32 por variável/estatística, ex: 'rain.yhat').
+
+    Os instantes não são gravados: a grade é horária e regular a partir de
+    `start` (metadado do arquivo), então a linha de um horário é calculada
+    diretamente. Todas as previsões devem compartilhar a mesma coluna 'ds'.
+    """
+    ds = pd.DatetimeIndex(next(iter(forecasts_dict.values()))['ds'])
+    if len(ds) > 1 and not (np.diff(ds.asi8) == PASSO.value).all():
+        raise ValueError("O horizonte gravado precisa ser uma grade horária regular")
+
+    colunas = {}
+    for tipo, df in forecasts_dict.items():
+        for coluna in COLUNAS:
+            if coluna in df:
+                colunas[f"{tipo}.{coluna}"] = pa.array(df[coluna].to_numpy(dtype=np.float32))
+    metadados = {
+        "start": ds[0].isoformat(),
+        "step_s": str(int(PASSO.total_seconds())),
+        "versao": versao,
+        "variaveis": json.dumps(list(forecasts_dict)),
+    }
+    tabela = pa.table(colunas, metadata=metadados)
+
+    caminho = _caminho(lat, lon)
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    tmp = f"{caminho}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with pa.OSFile(tmp, "wb") as sink, pa.ipc.new_file(sink, tabela.schema) as writer:
+        writer.write_table(tabela)
+    # Troca atômica: leitores com o arquivo antigo mapeado continuam válidos
+    os.replace(tmp, caminho)
+
+
+def ler_janela(lat, lon, future_ds, intervalos=True):
+    """
+    Lê do arquivo da célula (memory-mapped, sem cópia) as previsões dos
+    instantes de `future_ds`, que deve ser horário e contíguo.
+
+    Returns:
+        dict ou None: {tipo: DataFrame(ds, yhat[, yhat_lower, yhat_upper])},
+        ou None se a célula não tem horizonte gravado ou ele não cobre a janela
+    """
+    caminho = _caminho(lat, lon)
+    if not os.path.exists(caminho):
+        return None
+    try:
+        with pa.memory_map(caminho, "r") as source:
+            tabela = pa.ipc.open_file(source).read_all()
+    except (OSError, pa.ArrowInvalid):
+        return None
+
+    metadados = {k.decode(): v.decode() for k, v in (tabela.schema.metadata or {}).items()}
+    start = pd.Timestamp(metadados["start"])
+    passo = pd.Timedelta(seconds=int(metadados["step_s"]))
+
+    inicio = (future_ds[0] - start) // passo
+    fim = (future_ds[-1] - start) // passo
+    if inicio < 0 or fim >= tabela.num_rows:
+        return None
+    janela = tabela.slice(inicio, fim - inicio + 1)
+
+    colunas = COLUNAS if intervalos else ['yhat']
+    resultado = {}
+    for tipo in json.loads(metadados["variaveis"]):
+        if intervalos and f"{tipo}.yhat_lower" not in janela.column_names:
+            return None
+        df = pd.DataFrame({'ds': future_ds})
+        for coluna in colunas:
+            df[coluna] = janela.column(f"{tipo}.{coluna}").to_numpy()
+        resultado[tipo] = df
+    return resultado
+
+
+def apagar(lat, lon):
+    try:
+        os.remove(_caminho(lat, lon))
+    except FileNotFoundError:
+        pass
+
+
+def horizonte(ds_historico):
+    """Grade horária do início do histórico até FORECAST_HORIZON_HOURS depois do fim."""
+    ds_historico = pd.DatetimeIndex(ds_historico).dropna()
+    inicio = ds_historico.min().floor('H')
+    fim = ds_historico.max() + pd.Timedelta(hours=Config.FORECAST_HORIZON_HOURS)
+    return pd.date_range(inicio, fim, freq='H')
+
+
+def calcular_e_gravar(lat, lon, modelos, ds_historico, versao=''):
+    """
+    Prevê o horizonte completo de todos os modelos da célula (no pool de
+    processos) e grava o resultado no arquivo colunar.
+    """
+    future_ds = horizonte(ds_historico)
+    resultados = executar_modelos([
+        {'chave': (lat, lon, tipo), 'modelo': modelo, 'future_ds': future_ds}
+        for tipo, modelo in modelos.items()
+    ])
+    forecasts = {tipo: resultados[(lat, lon, tipo)][1] for tipo in modelos}
+    with _lock:
+        gravar_horizonte(lat, lon, forecasts, versao)
+    print(f"Horizonte de previsões gravado para {lat},{lon} ({len(future_ds)} horas)")
+
+
+def aguardar_gravacoes():
+    """Bloqueia até que as gravações agendadas até agora terminem."""
+    _gravacoes.submit(lambda: None).result()
+
+
+def agendar_gravacao(lat, lon, modelos, ds_historico, versao=''):
+    """
+    Calcula e grava o horizonte em segundo plano (ou na hora, se
+    FORECAST_STORE_ASYNC estiver desligado), sem atrasar a resposta.
+    """
+    if not Config.FORECAST_STORE_ASYNC:
+        calcular_e_gravar(lat, lon, modelos, ds_historico, versao)
+        return
+
+    def _log_erro(futuro):
+        if futuro.exception():
+            print(f"Falha ao gravar horizonte de {lat},{lon}: {futuro.exception()}")
+
+    _gravacoes.submit(calcular_e_gravar, lat, lon, modelos, ds_historico, versao).add_done_callback(_log_erro)
@@ -1,15 +1,96 @@
-import psycopg2
-import os
+import time
+import threading
+from contextlib import contextmanager
+import psycopg2.extensions
+from sqlalchemy import create_engine
+from sqlalchemy.engine import URL
+from ..config_env import Config
+from . import tracing
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def _registrar_query(query, duracao):
+    if isinstance(query, bytes):
+        query = query.decode("utf-8", errors="replace")
+    chave = " ".join(str(query).split())[:120]
+    tracing.observar("app_db_query_seconds", duracao, ajuda="Duração dos comandos SQL",
+                     operation=(chave.split(" ", 1)[0] or "?").upper())
+    if duracao * 1000 >= Config.DB_SLOW_QUERY_MS:
+        print(f"Query lenta ({duracao * 1000:.0f} ms): {chave}")
+
+
+class TimedCursor(psycopg2.extensions.cursor):
+    """Cursor psycopg2 que mede o tempo de cada comando executado."""
+
+    def execute(self, query, vars=None):
+        inicio = time.perf_counter()
+        try:
+            return super().execute(query, vars)
+        finally:
+            _registrar_query(query, time.perf_counter() - inicio)
+
+    def executemany(self, query, vars_list):
+        inicio = time.perf_counter()
+        try:
+            return super().executemany(query, vars_list)
+        finally:
+            _registrar_query(query, time.perf_counter() - inicio)
+
+    def copy_expert(self, sql, file, size=8192):
+        inicio = time.perf_counter()
+        try:
+            return super().copy_expert(sql, file, size)
+        finally:
+            _registrar_query(sql, time.perf_counter() - inicio)
+
+
+def get_db_url():
+    return URL.create(
+        "postgresql+psycopg2",
+        username=Config.DB_USER or 'postgres',
+        password=Config.DB_PASS or 'rafa7887',
+        host=Config.DB_HOST or 'localhost',
+        port=Config.DB_PORT or 5433,
+        database=Config.DB_NAME or 'the-chess',
+    )
+
+
+def get_db_engine():
+    """
+    Retorna o engine SQLAlchemy do processo. O pool dele é o único pool de
+    conexões da aplicação: tanto o pandas/SQLAlchemy quanto as funções que
+    usam psycopg2 diretamente (via get_db_connection) pegam conexões dele.
+    """
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = create_engine(
+                get_db_url(),
+                pool_size=Config.DB_POOL_SIZE,
+                max_overflow=Config.DB_POOL_MAX_OVERFLOW,
+                pool_timeout=Config.DB_POOL_TIMEOUT,
+                pool_recycle=Config.DB_POOL_RECYCLE,
+                pool_pre_ping=True,  # Health check antes de entregar a conexão
+                connect_args={"cursor_factory": TimedCursor},
+            )
+        return _engine
+
 
 def get_db_connection():
     """
-    Cria e retorna uma conexão com o banco de dados PostgreSQL usando variáveis de ambiente.
+    Retorna uma conexão psycopg2 emprestada do pool compartilhado.
+    `conn.close()` devolve a conexão ao pool em vez de fechá-la.
     """
-    conn = psycopg2.connect(
-        host=os.getenv('POSTGRES_HOST', 'localhost'),
-        port=os.getenv('POSTGRES_PORT', '5432'),
-        dbname=os.getenv('POSTGRES_DB', 'the-chess'),
-        user=os.getenv('POSTGRES_USER', 'postgres'),
-        password=os.getenv('POSTGRES_PASSWORD', 'rafa7887')
-    )
-    return conn
+    return get_db_engine().raw_connection()
+
+
+@contextmanager
+def db_connection():
+    """Empresta uma conexão do pool e a devolve ao final do bloco."""
+    conn = get_db_connection()
+    try:
+        yield conn
+    finally:
+        conn.close()
@@ -0,0 +1,142 @@
+import os
+import json
+import threading
+import pandas as pd
+from ..config_env import Config
+from . import tracing
+
+# Tolerância para considerar que o intervalo pedido foi coberto pelos dados
+# retornados (as séries do Giovanni são horárias).
+PASSO_SERIE = pd.Timedelta(hours=1)
+
+_locks = {}
+_locks_guard = threading.Lock()
+
+
+def _lock_para(chave):
+    with _locks_guard:
+        lock = _locks.get(chave)
+        if lock is None:
+            lock = _locks[chave] = threading.Lock()
+        return lock
+
+
+def _caminhos(lat, lon, variable):
+    pasta = os.path.join(Config.GIOVANNI_CACHE_DIR, variable)
+    nome = f"{float(lat):.4f}_{float(lon):.4f}"
+    return os.path.join(pasta, f"{nome}.parquet"), os.path.join(pasta, f"{nome}.json")
+
+
+def _normalizar(df):
+    """
+    Timestamp sempre em datetime64[ns]: versões novas do pyarrow podem gravar
+    (e ler de volta) o parquet em microssegundos, e o pandas não concatena
+    uma parte em [us] com outra em [ns].
+    """
+    if df["Timestamp"].dtype != "datetime64[ns]":
+        df = df.assign(Timestamp=df["Timestamp"].astype("datetime64[ns]"))
+    return df
+
+
+def _ler_cache(lat, lon, variable):
+    caminho_dados, caminho_meta = _caminhos(lat, lon, variable)
+    if not (os.path.exists(caminho_dados) and os.path.exists(caminho_meta)):
+        return None, None
+    try:
+        with open(caminho_meta) as f:
+            meta = json.load(f)
+        df = pd.read_parquet(caminho_dados)
+    except Exception as e:
+        print(f"Cache inválido para {variable} em {lat},{lon}, ignorando: {e}")
+        return None, None
+    return _normalizar(df), (pd.Timestamp(meta["time_start"]), pd.Timestamp(meta["time_end"]))
+
+
+def _gravar_cache(lat, lon, variable, df, cobertura):
+    caminho_dados, caminho_meta = _caminhos(lat, lon, variable)
+    os.makedirs(os.path.dirname(caminho_dados), exist_ok=True)
+
+    # Grava em arquivos temporários e troca de forma atômica, para que uma
+    # leitura concorrente nunca veja um arquivo pela metade.
+    tmp_dados = f"{caminho_dados}.{os.getpid()}.tmp"
+    tmp_meta = f"{caminho_meta}.{os.getpid()}.tmp"
+    df.to_parquet(tmp_dados, index=False)
+    with open(tmp_meta, "w") as f:
+        json.dump({
+            "time_start": cobertura[0].isoformat(),
+            "time_end": cobertura[1].isoformat(),
+        }, f)
+    os.replace(tmp_dados, caminho_dados)
+    os.replace(tmp_meta, caminho_meta)
+
+
+def _formatar(ts):
+    return ts.strftime("%Y-%m-%dT%H:%M:%S")
+
+
+def get_cached_series(lat, lon, variable, time_start, time_end, fetch):
+    """
+    Retorna a série de uma variável para (lat, lon) no intervalo pedido,
+    consultando primeiro o cache em disco.
+
+    Apenas os trechos ainda não cobertos pelo cache (início e/ou fim) são
+    buscados no Giovanni através de `fetch(time_start, time_end)`, que deve
+    retornar um DataFrame com as colunas ['Timestamp', <variável>].
+
+    Args:
+        lat (float): Latitude do ponto
+        lon (float): Longitude do ponto
+        variable (str): Nome da variável no Giovanni (ex: 'M2I1NXLFO_5_12_4_TLML')
+        time_start (str): Início do intervalo (ISO 8601)
+        time_end (str): Fim do intervalo (ISO 8601)
+        fetch (callable): Função que baixa e interpreta um intervalo
+    Returns:
+        pd.DataFrame: Série restrita ao intervalo pedido
+    """
+    inicio = pd.Timestamp(time_start)
+    fim = pd.Timestamp(time_end)
+
+    with _lock_para((float(lat), float(lon), variable)):
+        df_cache, cobertura = _ler_cache(lat, lon, variable)
+        if df_cache is None:
+            resultado = "miss"
+        elif inicio < cobertura[0] or fim > cobertura[1]:
+            resultado = "partial"
+        else:
+            resultado = "hit"
+        tracing.incrementar("app_cache_requests_total", ajuda="Consultas aos caches, por resultado",
+                            cache="giovanni", result=resultado)
+
+        if df_cache is None:
+            partes = [fetch(_formatar(inicio), _formatar(fim))]
+            cobertura = (inicio, fim)
+        else:
+            partes = [df_cache]
+            # Intervalos faltantes são pedidos a partir da borda já coberta;
+            # o registro repetido é descartado na deduplicação abaixo.
+            if inicio < cobertura[0]:
+                partes.append(fetch(_formatar(inicio), _formatar(cobertura[0])))
+            if fim > cobertura[1]:
+                partes.append(fetch(_formatar(cobertura[1]), _formatar(fim)))
+            cobertura = (min(inicio, cobertura[0]), max(fim, cobertura[1]))
+
+        if len(partes) > 1 or df_cache is None:
+            df = pd.concat([_normalizar(parte) for parte in partes], ignore_index=True)
+            df = df.drop_duplicates(subset="Timestamp", keep="last")
+            df = df.sort_values("Timestamp", ignore_index=True)
+
+            # Se o Giovanni ainda não publicou dados até o fim pedido, só
+            # consideramos coberto até o último registro recebido, para que
+            # a próxima chamada volte a buscar esse trecho.
+            if not df.empty:
+                primeiro, ultimo = df["Timestamp"].iloc[0], df["Timestamp"].iloc[-1]
+                cobertura = (
+                    cobertura[0] if primeiro <= cobertura[0] + PASSO_SERIE else primeiro,
+                    cobertura[1] if ultimo >= cobertura[1] - PASSO_SERIE else ultimo,
+                )
+                _gravar_cache(lat, lon, variable, df, cobertura)
+        else:
+            df = df_cache
+
+    mascara = (df["Timestamp"] >= inicio) & (df["Timestamp"] <= fim)
+    return df.loc[mascara].reset_index(drop=True)
@@ -0,0 +1,107 @@
+import time
+import random
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor
+from ..config_env import Config
+from . import tracing
+
+# Respostas que indicam throttling ou falha temporária do Giovanni
+STATUS_RETENTAVEIS = (429, 500, 502, 503, 504)
+
+
+class TokenBucket:
+    """
+    Limitador de taxa simples: libera até `capacidade` requisições de uma vez
+    e repõe `taxa` fichas por segundo. Compartilhado por todas as threads.
+    """
+
+    def __init__(self, taxa, capacidade):
+        self.taxa = float(taxa)
+        self.capacidade = float(capacidade)
+        self._fichas = float(capacidade)
+        self._ultimo = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if self.taxa <= 0:
+            return
+        while True:
+            with self._lock:
+                agora = time.monotonic()
+                self._fichas = min(self.capacidade, self._fichas + (agora - self._ultimo) * self.taxa)
+                self._ultimo = agora
+                if self._fichas >= 1:
+                    self._fichas -= 1
+                    return
+                espera = (1 - self._fichas) / self.taxa
+            time.sleep(espera)
+
+
+_session = None
+_session_lock = threading.Lock()
+_semaforo = threading.BoundedSemaphore(Config.GIOVANNI_MAX_CONCURRENCY)
+_bucket = TokenBucket(Config.GIOVANNI_RATE_PER_SEC, Config.GIOVANNI_BURST)
+_executor = ThreadPoolExecutor(max_workers=Config.GIOVANNI_FETCH_WORKERS, thread_name_prefix="giovanni")
+
+
+def get_session():
+    """Retorna a sessão HTTP do processo, com conexões keep-alive reutilizadas."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=Config.GIOVANNI_MAX_CONCURRENCY)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _session = session
+        return _session
+
+
+def get_executor():
+    """Pool de threads compartilhado para os downloads de todas as requisições."""
+    return _executor
+
+
+def _tempo_de_espera(tentativa, response=None):
+    if response is not None:
+        retry_after = response.headers.get("Retry-After")
+        if retry_after and retry_after.isdigit():
+            return float(retry_after)
+    return Config.GIOVANNI_BACKOFF * (2 ** tentativa) + random.uniform(0, Config.GIOVANNI_BACKOFF)
+
+
+def _contar_resposta(status):
+    tracing.incrementar("app_giovanni_responses_total", ajuda="Respostas do Giovanni, por status ou erro de conexão",
+                        status=status)
+
+
+def get(url, params=None, headers=None):
+    """
+    Faz um GET respeitando o limite global de concorrência e de taxa do
+    Giovanni. Respostas 429/5xx e falhas de conexão são repetidas com backoff
+    exponencial; a espera acontece fora do semáforo para não segurar vagas.
+    """
+    session = get_session()
+    for tentativa in range(Config.GIOVANNI_RETRIES + 1):
+        ultima = tentativa == Config.GIOVANNI_RETRIES
+        _bucket.acquire()
+        try:
+            with _semaforo, tracing.span("giovanni_request"):
+                response = session.get(url, params=params, headers=headers, timeout=Config.GIOVANNI_TIMEOUT)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            _contar_resposta(type(e).__name__)
+            if ultima:
+                raise
+            time.sleep(_tempo_de_espera(tentativa))
+            continue
+
+        _contar_resposta(response.status_code)
+        if response.status_code in STATUS_RETENTAVEIS and not ultima:
+            print(f"Giovanni respondeu {response.status_code}, tentando novamente ({tentativa + 1}/{Config.GIOVANNI_RETRIES})")
+            time.sleep(_tempo_de_espera(tentativa, response))
+            continue
+
+        response.raise_for_status()  # Raise an exception for bad status codes
+        return response
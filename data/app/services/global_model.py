@@ -0,0 +1,240 @@
+import math
+import zlib
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from app.config_env import Config
+from app.services import history_store
+from app.services.engines import get_motor, motor_do_modelo
+from app.services.model_registry import registry
+from app.services.modelos import versao_dados, janela_previsao, build_forecast_json, existe_dados_historicos
+from app.services.training_executor import VARIAVEIS
+from app.utils.grid import snap_to_grid
+
+# Modelos globais são gravados no registro com o canto sudoeste do shard como
+# localização e este prefixo no tipo (ex: 'global_temperature').
+PREFIXO_TIPO = "global_"
+
+ESTRATEGIAS_REGIAO = ("all", "random", "grid")
+ESTRATEGIAS_TEMPO = ("all", "stride", "random", "recent")
+
+
+def amostragem_padrao(**kwargs):
+    """
+    Parâmetros de amostragem do treino global:
+        regiao: 'all' (todas as células do shard), 'random' (sorteio) ou
+            'grid' (espaçadas de forma uniforme), até `max_celulas`
+        tempo: 'all', 'stride' (uma hora a cada `passo`, com deslocamento por
+            célula para cobrir todas as horas do dia no conjunto), 'random'
+            (fração `fracao` das horas) ou 'recent' (últimos `dias` dias)
+        max_linhas: teto de linhas por shard após a amostragem
+    """
+    amostragem = dict(
+        regiao="grid", max_celulas=Config.GLOBAL_MAX_CELLS,
+        tempo="stride", passo=6, fracao=0.1, dias=365,
+        max_linhas=Config.GLOBAL_MAX_ROWS, seed=Config.TRAINING_SEED,
+    )
+    amostragem.update({k: v for k, v in kwargs.items() if v is not None})
+    if amostragem["regiao"] not in ESTRATEGIAS_REGIAO:
+        raise ValueError(f"Estratégia de região desconhecida: {amostragem['regiao']}")
+    if amostragem["tempo"] not in ESTRATEGIAS_TEMPO:
+        raise ValueError(f"Estratégia de tempo desconhecida: {amostragem['tempo']}")
+    return amostragem
+
+
+def shard_da_celula(lat, lon):
+    """Canto sudoeste do shard (quadrado de GLOBAL_SHARD_DEG graus) da célula."""
+    graus = Config.GLOBAL_SHARD_DEG
+    return math.floor(lat / graus) * graus, math.floor(lon / graus) * graus
+
+
+def _rng(amostragem, *chave):
+    return np.random.default_rng((amostragem["seed"] + zlib.crc32(repr(chave).encode())) % (2 ** 32))
+
+
+def amostrar_celulas(celulas, amostragem, shard=None):
+    celulas = sorted(celulas)
+    limite = amostragem["max_celulas"]
+    if amostragem["regiao"] == "all" or len(celulas) <= limite:
+        return celulas
+    if amostragem["regiao"] == "random":
+        escolhidas = _rng(amostragem, shard).choice(len(celulas), limite, replace=False)
+        return [celulas[i] for i in sorted(escolhidas)]
+    return [celulas[i] for i in np.linspace(0, len(celulas) - 1, limite).round().astype(int)]
+
+
+def amostrar_tempo(df, amostragem, celula):
+    estrategia = amostragem["tempo"]
+    if estrategia == "stride":
+        passo = amostragem["passo"]
+        return df.iloc[zlib.crc32(repr(celula).encode()) % passo::passo]
+    if estrategia == "random":
+        mascara = _rng(amostragem, celula).random(len(df)) < amostragem["fracao"]
+        return df[mascara]
+    if estrategia == "recent":
+        return df[df['Timestamp_Local'] > df['Timestamp_Local'].max() - pd.Timedelta(days=amostragem["dias"])]
+    return df
+
+
+def iterar_amostras(celulas, amostragem, tamanho_lote=None):
+    """
+    Lê o histórico das células em lotes de `tamanho_lote` células e devolve,
+    para cada lote, um DataFrame com a amostra no tempo de cada célula e as
+    colunas lat/lon. Só a amostra é copiada para a memória.
+    """
+    tamanho_lote = tamanho_lote or Config.GLOBAL_CHUNK_CELLS
+    colunas = ['Timestamp_Local'] + list(VARIAVEIS.values())
+    for i in range(0, len(celulas), tamanho_lote):
+        partes = []
+        for lat, lon in celulas[i:i + tamanho_lote]:
+            df = history_store.ler(lat, lon)
+            if df is None:
+                continue
+            amostra = amostrar_tempo(df, amostragem, (lat, lon))[colunas].copy()
+            amostra['lat'] = np.float32(lat)
+            amostra['lon'] = np.float32(lon)
+            partes.append(amostra)
+        if partes:
+            yield pd.concat(partes, ignore_index=True)
+
+
+def amostra_limitada(lotes, max_linhas, rng):
+    """
+    Consome os lotes um a um e mantém só uma amostra uniforme de até
+    `max_linhas` linhas do conjunto (cada linha recebe uma chave aleatória e
+    ficam as menores). O pico de memória é a amostra mais um lote, e não o
+    shard inteiro. As linhas voltam na ordem em que foram lidas.
+    """
+    amostra, chaves, ordem = None, None, None
+    lidas = 0
+    for lote in lotes:
+        lote = lote.dropna(subset=['Timestamp_Local'])
+        if lote.empty:
+            continue
+        lote_chaves = rng.random(len(lote))
+        lote_ordem = np.arange(lidas, lidas + len(lote))
+        lidas += len(lote)
+        if amostra is None:
+            amostra, chaves, ordem = lote, lote_chaves, lote_ordem
+        else:
+            amostra = pd.concat([amostra, lote], ignore_index=True)
+            chaves = np.concatenate([chaves, lote_chaves])
+            ordem = np.concatenate([ordem, lote_ordem])
+        if len(amostra) > max_linhas:
+            manter = np.argpartition(chaves, max_linhas - 1)[:max_linhas]
+            amostra, chaves, ordem = amostra.iloc[manter].reset_index(drop=True), chaves[manter], ordem[manter]
+    if amostra is None:
+        return None
+    return amostra.iloc[np.argsort(ordem)].reset_index(drop=True)
+
+
+def treinar_shard(shard, celulas, amostragem):
+    """
+    Treina e registra os modelos globais de um shard (um por variável), com
+    lat/lon como regressores, sobre a amostra das suas células. As amostras
+    são lidas em lotes de células e reduzidas a `max_linhas` à medida que
+    chegam (amostra_limitada).
+
+    Returns:
+        tuple: (shard, células usadas, linhas de treino)
+    """
+    celulas = amostrar_celulas(celulas, amostragem, shard)
+    df = amostra_limitada(iterar_amostras(celulas, amostragem), amostragem["max_linhas"], _rng(amostragem, shard, "linhas"))
+    if df is None:
+        raise ValueError(f"Nenhum histórico local para o shard {shard}")
+
+    motor = get_motor()
+    modelos = motor.treinar_lote(
+        df['Timestamp_Local'].to_numpy(dtype='datetime64[ns]'),
+        df[list(VARIAVEIS.values())].to_numpy(dtype=np.float64),
+        regressores={'lat': df['lat'].to_numpy(dtype=np.float64), 'lon': df['lon'].to_numpy(dtype=np.float64)},
+    )
+    versao = versao_dados(df)
+    for tipo, modelo in zip(VARIAVEIS, modelos):
+        registry.put(shard[0], shard[1], PREFIXO_TIPO + tipo, modelo, versao)
+    return shard, len(celulas), len(df)
+
+
+def treinar_modelos_globais(celulas=None, amostragem=None, workers=None):
+    """
+    Agrupa as células com histórico local por shard e treina os shards em
+    paralelo, em processos separados.
+
+    Returns:
+        list[tuple]: (shard, células usadas, linhas de treino) de cada shard
+    """
+    amostragem = amostragem or amostragem_padrao()
+    workers = workers or Config.GLOBAL_WORKERS
+    shards = {}
+    for celula in (celulas if celulas is not None else history_store.celulas()):
+        shards.setdefault(shard_da_celula(*celula), []).append(celula)
+    if not shards:
+        return []
+
+    contexto = multiprocessing.get_context(Config.TRAINING_MP_CONTEXT)
+    with ProcessPoolExecutor(max_workers=min(workers, len(shards)), mp_context=contexto) as executor:
+        futuros = [executor.submit(treinar_shard, shard, lista, amostragem) for shard, lista in shards.items()]
+        resultados = []
+        for futuro in futuros:
+            try:
+                resultados.append(futuro.result())
+            except Exception as e:
+                print(f"Falha no treino de um shard global: {e}")
+    return resultados
+
+
+def prever_global(lat, lon, date, inicio=None, fim=None, intervalos=True):
+    """
+    Previsão de uma célula pelos modelos globais do seu shard.
+
+    Returns:
+        dict ou None: JSON da previsão (como em `modelo`), ou None se o shard
+        ainda não tem modelos globais
+    """
+    lat, lon = snap_to_grid(lat, lon)
+    shard = shard_da_celula(lat, lon)
+    future_ds = janela_previsao(date, inicio, fim)
+    regressores = {'lat': np.full(len(future_ds), lat), 'lon': np.full(len(future_ds), lon)}
+
+    forecasts_dict = {}
+    for tipo in VARIAVEIS:
+        modelo = registry.get(shard[0], shard[1], PREFIXO_TIPO + tipo)
+        if modelo is None:
+            return None
+        forecasts_dict[tipo] = motor_do_modelo(modelo).prever(modelo, future_ds, intervalos, regressores)
+    return build_forecast_json(date, forecasts_dict, lat, lon)
+
+
+def atender_celula_nova(lat, lon, date, inicio=None, fim=None, intervalos=True):
+    """
+    Se a célula ainda não tem histórico próprio (e o GLOBAL_MODEL_SERVING está
+    ligado), responde pelo modelo global do shard. Retorna None caso contrário.
+    """
+    if not Config.GLOBAL_MODEL_SERVING:
+        return None
+    lat, lon = snap_to_grid(lat, lon)
+    if existe_dados_historicos(lat, lon):
+        return None
+    return prever_global(lat, lon, date, inicio, fim, intervalos)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Treina os modelos globais por região a partir do histórico local das células.")
+    parser.add_argument("--workers", type=int, help="Shards treinados em paralelo")
+    parser.add_argument("--region", choices=ESTRATEGIAS_REGIAO, help="Amostragem das células de cada shard")
+    parser.add_argument("--max-cells", type=int, help="Máximo de células por shard")
+    parser.add_argument("--time", choices=ESTRATEGIAS_TEMPO, help="Amostragem das horas de cada célula")
+    parser.add_argument("--step", type=int, help="Passo em horas (--time stride)")
+    parser.add_argument("--fraction", type=float, help="Fração das horas (--time random)")
+    parser.add_argument("--days", type=int, help="Dias mais recentes (--time recent)")
+    parser.add_argument("--max-rows", type=int, help="Máximo de linhas de treino por shard")
+    args = parser.parse_args(argv)
+
+    amostragem = amostragem_padrao(
+        regiao=args.region, max_celulas=args.max_cells, tempo=args.time, passo=args.step,
+        fracao=args.fraction, dias=args.days, max_linhas=args.max_rows,
+    )
+    for shard, n_celulas, n_linhas in treinar_modelos_globais(amostragem=amostragem, workers=args.workers):
+        print(f"Shard {shard}: {n_celulas} células, {n_linhas} linhas")
@@ -0,0 +1,133 @@
+import os
+import threading
+import numpy as np
+import pandas as pd
+from app.config_env import Config
+
+# Uma coluna por arquivo, em binário cru: o instante local em int64 (ns) e as
+# variáveis em float32. Novas horas são sempre acrescentadas ao fim dos arquivos.
+COLUNA_TEMPO = 'Timestamp_Local'
+COLUNAS_VALORES = ['TLML', 'QLML', 'SPEEDLML', 'PRECTOTCORR', 'TQV']
+
+_locks = {}
+_locks_guard = threading.Lock()
+
+
+def _lock_para(chave):
+    with _locks_guard:
+        lock = _locks.get(chave)
+        if lock is None:
+            lock = _locks[chave] = threading.Lock()
+        return lock
+
+
+def _pasta(lat, lon):
+    return os.path.join(Config.HISTORY_STORE_DIR, f"{float(lat):.4f}_{float(lon):.4f}")
+
+
+def _arquivos(lat, lon):
+    pasta = _pasta(lat, lon)
+    arquivos = {COLUNA_TEMPO: (os.path.join(pasta, f"{COLUNA_TEMPO}.i8"), np.int64)}
+    for coluna in COLUNAS_VALORES:
+        arquivos[coluna] = (os.path.join(pasta, f"{coluna}.f4"), np.float32)
+    return arquivos
+
+
+def _linhas(arquivos):
+    """
+    Linhas completas gravadas: o menor tamanho entre as colunas. Uma escrita
+    interrompida no meio deixa sobras no fim de algumas colunas, que são ignoradas.
+    """
+    tamanhos = []
+    for caminho, dtype in arquivos.values():
+        if not os.path.exists(caminho):
+            return 0
+        tamanhos.append(os.path.getsize(caminho) // np.dtype(dtype).itemsize)
+    return min(tamanhos)
+
+
+def celulas():
+    """Células com histórico local, como pares (lat, lon)."""
+    if not os.path.isdir(Config.HISTORY_STORE_DIR):
+        return []
+    resultado = []
+    for nome in sorted(os.listdir(Config.HISTORY_STORE_DIR)):
+        try:
+            lat, lon = (float(v) for v in nome.split('_'))
+        except ValueError:
+            continue
+        if existe(lat, lon):
+            resultado.append((lat, lon))
+    return resultado
+
+
+def existe(lat, lon):
+    return _linhas(_arquivos(lat, lon)) > 0
+
+
+def ler(lat, lon):
+    """
+    Histórico da célula como DataFrame cujas colunas são visões (memory-mapped,
+    sem cópia) dos arquivos, com lat/lon em `df.attrs`.
+
+    Returns:
+        pd.DataFrame ou None se a célula não tem histórico local
+    """
+    arquivos = _arquivos(lat, lon)
+    n = _linhas(arquivos)
+    if n == 0:
+        return None
+    colunas = {}
+    for coluna, (caminho, dtype) in arquivos.items():
+        colunas[coluna] = np.memmap(caminho, dtype=dtype, mode='r', shape=(n,))
+    colunas[COLUNA_TEMPO] = colunas[COLUNA_TEMPO].view('datetime64[ns]')
+    df = pd.DataFrame(colunas, copy=False)
+    df.attrs.update(lat=float(lat), lon=float(lon))
+    return df
+
+
+def ultimo(lat, lon):
+    """Último instante local gravado para a célula (ou None)."""
+    caminho, dtype = _arquivos(lat, lon)[COLUNA_TEMPO]
+    n = _linhas(_arquivos(lat, lon))
+    if n == 0:
+        return None
+    ultimo_ns = np.memmap(caminho, dtype=dtype, mode='r', shape=(n,))[-1]
+    return pd.Timestamp(int(ultimo_ns))
+
+
+def anexar(lat, lon, df_local):
+    """
+    Acrescenta ao fim dos arquivos da célula as linhas de `df_local` posteriores
+    ao último instante já gravado. Os dados existentes nunca são reescritos.
+
+    Returns:
+        int: Quantidade de linhas acrescentadas
+    """
+    with _lock_para((round(float(lat), 4), round(float(lon), 4))):
+        arquivos = _arquivos(lat, lon)
+        n = _linhas(arquivos)
+        ultimo_gravado = ultimo(lat, lon)
+        novos = df_local if ultimo_gravado is None else df_local[df_local[COLUNA_TEMPO] > ultimo_gravado]
+        if novos.empty:
+            return 0
+
+        os.makedirs(_pasta(lat, lon), exist_ok=True)
+        # O tempo é gravado por último: ele só "confirma" linhas cujos valores já estão no disco
+        for coluna in COLUNAS_VALORES + [COLUNA_TEMPO]:
+            caminho, dtype = arquivos[coluna]
+            valores = novos[coluna].to_numpy(dtype='datetime64[ns]').view(np.int64) if coluna == COLUNA_TEMPO \
+                else novos[coluna].to_numpy(dtype=dtype)
+            with open(caminho, 'ab') as f:
+                # Descarta sobras de uma escrita interrompida antes de acrescentar
+                f.truncate(n * np.dtype(dtype).itemsize)
+                f.write(np.ascontiguousarray(valores, dtype=dtype).tobytes())
+        return len(novos)
+
+
+def apagar(lat, lon):
+    for caminho, _ in _arquivos(lat, lon).values():
+        try:
+            os.remove(caminho)
+        except FileNotFoundError:
+            pass
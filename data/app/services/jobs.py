@@ -0,0 +1,111 @@
+import time
+import uuid
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from app.config_env import Config
+from app.services.pipeline import executar_pipeline
+from app.services.modelos import janela_previsao, ler_data
+from app.utils.grid import snap_to_grid
+
+
+class Job:
+    def __init__(self, chave, lat, lon, date):
+        self.id = uuid.uuid4().hex
+        self.chave = chave
+        self.lat = lat
+        self.lon = lon
+        self.date = date
+        self.status = "queued"
+        self.stage = "queued"
+        self.stages = []
+        self.result = None
+        self.cached = False
+        self.error = None
+        self.created_at = time.time()
+        self.finished_at = None
+
+    def set_stage(self, stage):
+        self.stage = stage
+        self.stages.append({"stage": stage, "at": time.time()})
+
+    def to_dict(self):
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "stage": self.stage,
+            "stages": list(self.stages),
+            "parameters_received": {"lat": self.lat, "lon": self.lon, "time_start": self.date},
+            "grid_cell": {"lat": self.chave[0], "lon": self.chave[1]},
+            "cached": self.cached,
+            "error": self.error,
+            "data": self.result,
+        }
+
+
+class JobManager:
+    """
+    Executa o pipeline em segundo plano num pool limitado de threads.
+
+    Pedidos idênticos (mesma célula da grade e data) em andamento são agrupados
+    num único job. Jobs de datas diferentes para a mesma célula rodam um de cada vez,
+    então só o primeiro paga a coleta/treino e os seguintes reaproveitam o
+    cache de séries e os modelos já treinados.
+    """
+
+    def __init__(self, workers, ttl):
+        self.ttl = ttl
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="job")
+        self._jobs = {}
+        self._em_andamento = {}
+        self._locks_local = {}
+        self._lock = threading.Lock()
+
+    def _lock_local(self, lat, lon):
+        with self._lock:
+            return self._locks_local.setdefault((lat, lon), threading.Lock())
+
+    def _limpar_antigos(self):
+        # Chamado com o lock adquirido
+        limite = time.time() - self.ttl
+        for job_id in [j.id for j in self._jobs.values() if j.finished_at and j.finished_at < limite]:
+            del self._jobs[job_id]
+
+    def submit(self, lat, lon, date):
+        """
+        Raises:
+            ValueError: Coordenadas ou data inválidas (antes de criar o job)
+        """
+        janela_previsao(date)
+        chave = snap_to_grid(lat, lon) + (ler_data(date).isoformat(),)
+        with self._lock:
+            self._limpar_antigos()
+            job = self._em_andamento.get(chave)
+            if job is not None:
+                return job
+            job = Job(chave, lat, lon, date)
+            self._jobs[job.id] = job
+            self._em_andamento[chave] = job
+        self._executor.submit(self._run, job)
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _run(self, job):
+        try:
+            job.status = "running"
+            with self._lock_local(job.chave[0], job.chave[1]):
+                job.result, job.cached = executar_pipeline(job.lat, job.lon, job.date, on_stage=job.set_stage)
+            job.status = "done"
+        except Exception as e:
+            job.status = "error"
+            job.set_stage("error")
+            job.error = str(e)
+        finally:
+            job.finished_at = time.time()
+            with self._lock:
+                self._em_andamento.pop(job.chave, None)
+
+
+jobs = JobManager(Config.JOB_WORKERS, Config.JOB_TTL)
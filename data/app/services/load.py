@@ -1,10 +1,4 @@
-import os
-from sqlalchemy import create_engine
-from dotenv import load_dotenv
-from config_env import DB_HOST, DB_PASS, DB_PORT, DB_NAME,DB_USER
-def get_db_engine():
-    conn_string = f"postgresql://{DB_USER}:{DB_PASS}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
-    return create_engine(conn_string)
+from app.services.get_db_connection import get_db_engine
 
 def load_data_to_db(df, table_name):
     """Carrega um DataFrame para uma tabela no banco de dados."""
@@ -0,0 +1,140 @@
+import time
+import pickle
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from app.config_env import Config
+from app.services.store_forecast import salvar_modelo_no_banco, buscar_modelo_serializado, buscar_versao_modelo
+
+
+def _local(lat, lon):
+    if lat is None or lon is None:
+        return None, None
+    return round(float(lat), 4), round(float(lon), 4)
+
+
+class ModelRegistry:
+    """
+    Registro de modelos treinados por (localização, variável, versão dos dados).
+
+    Mantém em memória um LRU dos modelos já desserializados, limitado pelo
+    tamanho serializado de cada um. Requisições concorrentes pelo mesmo modelo
+    compartilham uma única carga do banco (single-flight). A versão mais
+    recente conhecida vale por `ttl` segundos; depois disso ela é conferida
+    no banco, para enxergar modelos retreinados por outros processos.
+    """
+
+    def __init__(self, max_bytes, ttl=None):
+        self.max_bytes = max_bytes
+        self.ttl = Config.MODEL_VERSION_TTL if ttl is None else ttl
+        self._lru = OrderedDict()      # (lat, lon, tipo, versao) -> (modelo, tamanho)
+        self._ultima_versao = {}       # (lat, lon, tipo) -> (versao mais recente conhecida, conferida em)
+        self._em_carga = {}            # chave -> Future da carga em andamento
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._metrics = {"hits": 0, "misses": 0, "shared_loads": 0, "loads": 0, "evictions": 0}
+
+    def _guardar(self, chave, modelo, tamanho, mais_recente=True):
+        # Chamado com o lock adquirido. A versão mais recente substitui as
+        # anteriores de (lat, lon, tipo), que deixam de ocupar o LRU.
+        if mais_recente:
+            for velha in [c for c in self._lru if c[:3] == chave[:3]]:
+                self._bytes -= self._lru.pop(velha)[1]
+            self._ultima_versao[chave[:3]] = (chave[3], time.monotonic())
+        antigo = self._lru.pop(chave, None)
+        if antigo is not None:
+            self._bytes -= antigo[1]
+        self._lru[chave] = (modelo, tamanho)
+        self._bytes += tamanho
+        while self._bytes > self.max_bytes and len(self._lru) > 1:
+            _, (_, tamanho_removido) = self._lru.popitem(last=False)
+            self._bytes -= tamanho_removido
+            self._metrics["evictions"] += 1
+
+    def _versao_atual(self, lat, lon, tipo):
+        """
+        Versão mais recente de (lat, lon, tipo): a conhecida, se conferida há
+        menos de `ttl`; senão, a do banco. None se nenhuma é conhecida (a
+        carga sem versão traz a mais recente).
+        """
+        with self._lock:
+            conhecida = self._ultima_versao.get((lat, lon, tipo))
+        if conhecida is None:
+            return None
+        if time.monotonic() - conhecida[1] < self.ttl:
+            return conhecida[0]
+        versao = buscar_versao_modelo(lat, lon, tipo)
+        with self._lock:
+            if versao is None:
+                self._ultima_versao.pop((lat, lon, tipo), None)
+            else:
+                self._ultima_versao[(lat, lon, tipo)] = (versao, time.monotonic())
+        return versao
+
+    def get(self, lat, lon, tipo, versao=None):
+        """
+        Retorna o modelo de (lat, lon, tipo) na versão pedida (ou a mais
+        recente), ou None se ele não existir no banco.
+        """
+        lat, lon = _local(lat, lon)
+        versao_resolvida = versao if versao is not None else self._versao_atual(lat, lon, tipo)
+        with self._lock:
+            chave = (lat, lon, tipo, versao_resolvida)
+            if versao_resolvida is not None and chave in self._lru:
+                self._lru.move_to_end(chave)
+                self._metrics["hits"] += 1
+                return self._lru[chave][0]
+
+            chave_carga = (lat, lon, tipo, versao_resolvida)
+            futuro = self._em_carga.get(chave_carga)
+            if futuro is not None:
+                self._metrics["shared_loads"] += 1
+                dono = False
+            else:
+                self._metrics["misses"] += 1
+                futuro = self._em_carga[chave_carga] = Future()
+                dono = True
+
+        if not dono:
+            return futuro.result()
+
+        try:
+            resultado = buscar_modelo_serializado(lat, lon, tipo, versao_resolvida)
+            modelo = None
+            if resultado:
+                blob, versao_banco = resultado
+                modelo = pickle.loads(blob)
+                with self._lock:
+                    self._metrics["loads"] += 1
+                    self._guardar((lat, lon, tipo, versao_banco), modelo, len(blob), mais_recente=versao is None)
+            futuro.set_result(modelo)
+            return modelo
+        except BaseException as e:
+            futuro.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._em_carga.pop(chave_carga, None)
+
+    def put(self, lat, lon, tipo, modelo, versao=''):
+        """Salva o modelo no banco e o deixa disponível no LRU como versão mais recente."""
+        tamanho = salvar_modelo_no_banco(lat, lon, tipo, modelo, versao)
+        lat, lon = _local(lat, lon)
+        with self._lock:
+            self._guardar((lat, lon, tipo, versao), modelo, tamanho)
+
+    def invalidate(self, lat, lon):
+        """Remove da memória todos os modelos de uma localização."""
+        lat, lon = _local(lat, lon)
+        with self._lock:
+            for chave in [c for c in self._lru if c[:2] == (lat, lon)]:
+                self._bytes -= self._lru.pop(chave)[1]
+            for chave in [c for c in self._ultima_versao if c[:2] == (lat, lon)]:
+                del self._ultima_versao[chave]
+
+    def stats(self):
+        with self._lock:
+            return dict(self._metrics, entries=len(self._lru), bytes=self._bytes)
+
+
+registry = ModelRegistry(Config.MODEL_CACHE_MAX_BYTES)
@@ -1,184 +1,213 @@
-from app.services.store_forecast import buscar_previsao_no_banco, salvar_previsao_no_banco, salvar_modelo_no_banco, buscar_modelo_no_banco, salvar_dados_historicos
+from app.services.store_forecast import salvar_previsao_no_banco, salvar_dados_historicos
+from app.services.model_registry import registry
+from datetime import datetime
+import numpy as np
 import pandas as pd
-from prophet import Prophet
-import json as js
+from app.services.training_executor import VARIAVEIS, executar_modelos, prever
+from app.services.align import frame_location
+from app.services.get_db_connection import db_connection
+from app.services.forecast_cache import guardar_previsao, invalidar_localizacao
+from app.services.forecast_store import agendar_gravacao
+from app.services import history_store, tracing
 
 def existe_dados_historicos(lat, lon):
-    from app.services.store_forecast import get_db_connection
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute(
-        """
-        SELECT 1 FROM historico_localizacao WHERE lat=%s AND lon=%s LIMIT 1
-        """,
-        (lat, lon)
-    )
-    existe = cursor.fetchone() is not None
-    cursor.close()
-    conn.close()
-    return existe
-
-def modelo(df_completed,date):
-    def get_or_train_model(tipo, df):
-        modelo = modelos_treinados.get(tipo)
-        if modelo:
-            modelo.fit(df)
-        else:
-            modelo = Prophet(
-                interval_width=0.95,
-                seasonality_mode='multiplicative',
-                daily_seasonality=True,
-                weekly_seasonality=True,
-                yearly_seasonality=True
-            )
-            modelo.add_seasonality(name='mensal', period=30.5, fourier_order=5)
-            modelo.add_seasonality(name='diaria', period=24, fourier_order=10)
-            modelo.fit(df)
-        return modelo
-    print('Entrei no modelo')
-    lat = df_completed['lat'].iloc[0]
-    lon = df_completed['lon'].iloc[0]
-    df_local = df_completed[(df_completed['lat'] == lat) & (df_completed['lon'] == lon)].copy()
+    if history_store.existe(lat, lon):
+        return True
+    with db_connection() as conn, conn.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT 1 FROM historico_localizacao WHERE lat=%s AND lon=%s LIMIT 1
+            """,
+            (lat, lon)
+        )
+        return cursor.fetchone() is not None
 
-    # NOVA LÓGICA: verifica se já existem dados históricos para lat/lon
-    if existe_dados_historicos(lat, lon):
-        print('Dados históricos já existem para esta localização. Apenas faz previsões.')
-        modelos_treinados = {}
-        for tipo in ["temperature", "humidity", "wind_speed", "rain", "water_vapor"]:
-            modelo_carregado = buscar_modelo_no_banco(lat, lon, tipo)
-            if modelo_carregado:
-                print(f"Reaproveitando modelo Prophet treinado para {tipo}...")
-                modelos_treinados[tipo] = modelo_carregado
-            else:
-                modelos_treinados[tipo] = None
-        df_prophet_temp = df_local.rename(columns={'Timestamp_Local': 'ds', 'TLML': 'y'})[['ds', 'y', 'lat', 'lon']]
-        df_prophet_humidity = df_local.rename(columns={'Timestamp_Local': 'ds', 'QLML': 'y'})[['ds', 'y', 'lat', 'lon']]
-        df_prophet_wind = df_local.rename(columns={'Timestamp_Local': 'ds', 'SPEEDLML': 'y'})[['ds', 'y', 'lat', 'lon']]
-        df_prophet_precipitation = df_local.rename(columns={'Timestamp_Local': 'ds', 'PRECTOTCORR': 'y'})[['ds', 'y', 'lat', 'lon']]
-        df_prophet_water = df_local.rename(columns={'Timestamp_Local': 'ds', 'TQV': 'y'})[['ds', 'y', 'lat', 'lon']]
-        model_temp = modelos_treinados["temperature"] or get_or_train_model("temperature", df_prophet_temp)
-        model_humidity = modelos_treinados["humidity"] or get_or_train_model("humidity", df_prophet_humidity)
-        model_wind = modelos_treinados["wind_speed"] or get_or_train_model("wind_speed", df_prophet_wind)
-        model_preciptation = modelos_treinados["rain"] or get_or_train_model("rain", df_prophet_precipitation)
-        model_water = modelos_treinados["water_vapor"] or get_or_train_model("water_vapor", df_prophet_water)
-    else:
-        print('Dados históricos não existem para esta localização. Salvando e treinando modelos...')
-        salvar_dados_historicos(lat, lon, df_local)
-        modelos_treinados = {}
-        for tipo in ["temperature", "humidity", "wind_speed", "rain", "water_vapor"]:
-            modelos_treinados[tipo] = None
-        df_prophet_temp = df_local.rename(columns={'Timestamp_Local': 'ds', 'TLML': 'y'})[['ds', 'y', 'lat', 'lon']]
-        df_prophet_humidity = df_local.rename(columns={'Timestamp_Local': 'ds', 'QLML': 'y'})[['ds', 'y', 'lat', 'lon']]
-        df_prophet_wind = df_local.rename(columns={'Timestamp_Local': 'ds', 'SPEEDLML': 'y'})[['ds', 'y', 'lat', 'lon']]
-        df_prophet_precipitation = df_local.rename(columns={'Timestamp_Local': 'ds', 'PRECTOTCORR': 'y'})[['ds', 'y', 'lat', 'lon']]
-        df_prophet_water = df_local.rename(columns={'Timestamp_Local': 'ds', 'TQV': 'y'})[['ds', 'y', 'lat', 'lon']]
-        model_temp = get_or_train_model("temperature", df_prophet_temp)
-        model_humidity = get_or_train_model("humidity", df_prophet_humidity)
-        model_wind = get_or_train_model("wind_speed", df_prophet_wind)
-        model_preciptation = get_or_train_model("rain", df_prophet_precipitation)
-        model_water = get_or_train_model("water_vapor", df_prophet_water)
-        salvar_modelo_no_banco(lat, lon, "temperature", model_temp)
-        salvar_modelo_no_banco(lat, lon, "humidity", model_humidity)
-        salvar_modelo_no_banco(lat, lon, "wind_speed", model_wind)
-        salvar_modelo_no_banco(lat, lon, "rain", model_preciptation)
-        salvar_modelo_no_banco(lat, lon, "water_vapor", model_water)
-    print('Sucesso2')
-    print("Realizando as previsões...")
-    future = model_temp.make_future_dataframe(periods=2920, freq='H')
-    future['lat'] = lat
-    future['lon'] = lon
-    forecast_temp = model_temp.predict(future)
-    forecast_humidity = model_humidity.predict(future)
-    forecast_wind = model_wind.predict(future)
-    forecast_preciptation = model_preciptation.predict(future)
-    forecast_water = model_water.predict(future)
-    print("Previsões geradas!")
-    print("\n")
-    # --- Temperatura ---
-
-
-    def build_forecast_json(date, forecasts_dict, df_completed):
-        """
-        Gera JSON de previsões para uma data/hora específica,
-        incluindo a série do dia inteiro para cada variável.
-        
-        Parameters:
-            date: str ou datetime - data/hora de interesse
-            forecasts_dict: dict - {"variavel": forecast_dataframe_Prophet, ...}
-            df_completed: pd.DataFrame - DataFrame com colunas ['lat','lon']
-        
-        Returns:
-            dict - JSON estruturado
-        """
-        
-        date_obj = pd.to_datetime(date)
-        output = {
-            'location': {
-                'lat': df_completed['lat'].iloc[0],
-                'lon': df_completed['lon'].iloc[0]
-            },
-            'timestamp': str(date_obj),
-            'forecast': {}
-        }
-        
-        for var_name, df_forecast in forecasts_dict.items():
-            df_forecast['ds'] = pd.to_datetime(df_forecast['ds'])
-            
-            predicted = df_forecast.loc[df_forecast['ds'] == date_obj, 'yhat'].values[0]
-            interval_90 = df_forecast.loc[df_forecast['ds'] == date_obj, ['yhat_lower','yhat_upper']].values[0].tolist()
-            
-            day_mask = forecast_temp['ds'].dt.date == date_obj.date()
-
-            # Seleciona os timestamps e valores
-            timestamps = df_forecast.loc[day_mask, 'ds']
-            values = df_forecast.loc[day_mask, 'yhat'].values.tolist()
-
-            # Formata os timestamps para string
-            timestamps_formatted = [ts.strftime("%Y-%m-%d %H:%M:%S") for ts in timestamps]
-
-            # Cria o dicionário final
-            series_df = {
-                "timestamp": timestamps_formatted,
-                "values": values
-            }
-            output['forecast'][var_name] = {
-                'predicted': predicted,
-                'interval_90': interval_90,
-                'series': series_df
-            }
-        
-        return output
-
-    forecasts_dict = {
-        "temperature": forecast_temp,
-        "humidity": forecast_humidity,
-        "wind_speed": forecast_wind,
-        "rain": forecast_preciptation,
-        "water_vapor": forecast_water
+def versao_dados(df_local):
+    """Versão dos dados de treino: a última hora local presente no histórico."""
+    return pd.Timestamp(df_local['Timestamp_Local'].max()).strftime('%Y%m%d%H')
+
+def ler_data(valor, nome="datetime"):
+    """
+    Data/hora de uma consulta (texto ISO ou datetime) como pd.Timestamp.
+
+    Raises:
+        ValueError: Valor ausente, de outro tipo ou que não é uma data
+    """
+    if not isinstance(valor, (str, datetime)):
+        raise ValueError(f"{nome} must be a date/time string, got {valor!r}")
+    momento = pd.to_datetime(valor)
+    if pd.isna(momento):
+        raise ValueError(f"{nome} is not a valid date/time: {valor!r}")
+    return momento
+
+def janela_previsao(date, inicio=None, fim=None):
+    """
+    Instantes (horários) a prever: por padrão o dia inteiro da data pedida,
+    ou o intervalo [inicio, fim] quando informado.
+
+    Raises:
+        ValueError: Data inválida, `inicio` depois de `fim` ou `date` fora da janela
+    """
+    date_obj = ler_data(date)
+    inicio = ler_data(inicio, "start") if inicio is not None else date_obj.normalize()
+    fim = ler_data(fim, "end") if fim is not None else date_obj.normalize() + pd.Timedelta(hours=23)
+    if inicio > fim:
+        raise ValueError(f"start ({inicio}) is after end ({fim})")
+    janela = pd.date_range(inicio.floor('H'), fim, freq='H')
+    if not janela[0] <= date_obj.floor('H') <= janela[-1]:
+        raise ValueError(f"datetime ({date_obj}) is outside the forecast window [{janela[0]}, {janela[-1]}]")
+    return janela
+
+def build_forecast_json(date, forecasts_dict, lat, lon):
+    """
+    Gera JSON de previsões para uma data/hora específica,
+    incluindo a série da janela prevista (o dia inteiro, por padrão) para cada variável.
+
+    Parameters:
+        date: str ou datetime - data/hora de interesse
+        forecasts_dict: dict - {"variavel": DataFrame com ds/yhat[/yhat_lower/yhat_upper], ...}
+        lat, lon: float - localização da previsão
+
+    Returns:
+        dict - JSON estruturado
+    """
+    date_obj = pd.to_datetime(date)
+    output = {
+        'location': {
+            'lat': lat,
+            'lon': lon
+        },
+        'timestamp': str(date_obj),
+        'forecast': {}
+    }
+
+    for var_name, df_forecast in forecasts_dict.items():
+        output['forecast'][var_name] = build_variable_json(date_obj, df_forecast)
+
+    return output
+
+def build_variable_json(date, df_forecast):
+    """
+    Bloco de uma variável no JSON de previsões: valor e intervalo no horário
+    de `date` e a série da janela prevista.
+    """
+    date_obj = pd.to_datetime(date)
+    # A janela é horária e ordenada: a linha do horário pedido sai por busca binária
+    ds = pd.DatetimeIndex(df_forecast['ds'])
+    linha = ds.searchsorted(date_obj.floor('H'))
+    if linha >= len(ds) or ds[linha] != date_obj.floor('H'):
+        raise ValueError(f"Data {date_obj} fora da janela prevista")
+
+    predicted = float(df_forecast['yhat'].iat[linha])
+    interval_90 = None
+    if 'yhat_lower' in df_forecast:
+        interval_90 = [float(df_forecast['yhat_lower'].iat[linha]), float(df_forecast['yhat_upper'].iat[linha])]
+
+    series_df = {
+        # Formatação vetorizada (mesmo texto de strftime("%Y-%m-%d %H:%M:%S"))
+        "timestamp": np.char.replace(np.datetime_as_string(ds.values, unit='s'), "T", " ").tolist(),
+        "values": df_forecast['yhat'].tolist()
+    }
+    return {
+        'predicted': predicted,
+        'interval_90': interval_90,
+        'series': series_df
     }
 
-    json_output = build_forecast_json(date, forecasts_dict, df_completed)
-    # Salva a previsão no banco para reutilização futura
-    salvar_previsao_no_banco(lat, lon, date, json_output)
+def modelo(df_completed, date, inicio=None, fim=None, intervalos=True, on_variable=None):
+    """
+    Treina (ou reaproveita) os modelos da localização e prevê só a janela
+    pedida: o dia de `date` ou o intervalo [inicio, fim]. Sem `intervalos`,
+    a amostragem de incerteza do Prophet é pulada. `on_variable(tipo, bloco)`,
+    se dado, recebe o bloco JSON de cada variável assim que ela é prevista.
+    """
+    lat, lon = frame_location(df_completed)
+
+    def prevista(tipo, df_forecast):
+        if on_variable:
+            on_variable(tipo, build_variable_json(date, df_forecast))
+
+    forecasts = prever_celula(df_completed, janela_previsao(date, inicio, fim), intervalos, on_forecast=prevista)
+
+    with tracing.span("json_build"):
+        json_output = build_forecast_json(date, forecasts, lat, lon)
+    if inicio is None and fim is None and intervalos:
+        # Salva a previsão no banco para reutilização futura
+        with tracing.span("forecast_save"):
+            salvar_previsao_no_banco(lat, lon, date, json_output)
+        guardar_previsao(lat, lon, date, json_output)
     return json_output
 
-def get_or_train_global_model(tipo, df):
-    modelo = buscar_modelo_no_banco(None, None, tipo)
-    if modelo:
-        print(f"Reaproveitando modelo global Prophet para {tipo}...")
-        return modelo
+def prever_celula(df_completed, future_ds, intervalos=True, on_forecast=None):
+    """
+    Treina (ou reaproveita) os modelos da célula de `df_completed` e prevê os
+    instantes de `future_ds` (quaisquer, não precisam ser contíguos).
+
+    Returns:
+        dict: {tipo: DataFrame(ds, yhat[, yhat_lower, yhat_upper])}, na ordem de VARIAVEIS;
+        `on_forecast(tipo, df)`, se dado, é chamado assim que cada variável é prevista
+    """
+    lat, lon = frame_location(df_completed)
+    df_local = df_completed
+
+    # NOVA LÓGICA: verifica se já existem dados históricos para lat/lon
+    celula_nova = not existe_dados_historicos(lat, lon)
+    if not celula_nova:
+        # Dados históricos já existem: reaproveita os modelos treinados
+        with tracing.span("model_load"):
+            modelos_treinados = {tipo: registry.get(lat, lon, tipo) for tipo in VARIAVEIS}
     else:
-        modelo = Prophet(
-            interval_width=0.95,
-            seasonality_mode='multiplicative',
-            daily_seasonality=True,
-            weekly_seasonality=True,
-            yearly_seasonality=True
-        )
-        modelo.add_seasonality(name='mensal', period=30.5, fourier_order=5)
-        modelo.add_seasonality(name='diaria', period=24, fourier_order=10)
-        modelo.add_regressor('lat')
-        modelo.add_regressor('lon')
-        modelo.fit(df)
-        salvar_modelo_no_banco(None, None, tipo, modelo)
-        return modelo
+        # Célula nova: salva o histórico e treina todos os modelos
+        with tracing.span("history_save"):
+            if salvar_dados_historicos(lat, lon, df_local):
+                invalidar_localizacao(lat, lon)
+        modelos_treinados = dict.fromkeys(VARIAVEIS)
+    # Mantém o histórico colunar local em dia (só acrescenta as horas que faltam)
+    with tracing.span("history_store"):
+        history_store.anexar(lat, lon, df_local)
+
+    ds = df_local['Timestamp_Local'].to_numpy(dtype='datetime64[ns]')
+
+    def prevista(tipo, df_forecast):
+        forecasts[tipo] = df_forecast
+        if on_forecast:
+            on_forecast(tipo, df_forecast)
+
+    # Modelos já carregados preveem primeiro, pois respondem na hora
+    forecasts = {}
+    for tipo, modelo_carregado in modelos_treinados.items():
+        if modelo_carregado is not None:
+            with tracing.span("predict", variable=tipo):
+                prevista(tipo, prever(modelo_carregado, future_ds, intervalos))
+
+    # Treino (e a previsão da janela) no pool de processos só para o que falta;
+    # cada variável é entregue assim que a sua tarefa termina.
+    tarefas = [
+        {
+            'chave': (lat, lon, tipo),
+            'ds': ds,
+            'y': df_local[coluna].to_numpy(dtype='float64'),
+            'future_ds': future_ds,
+            'modelo': None,
+            'intervalos': intervalos,
+        }
+        for tipo, coluna in VARIAVEIS.items()
+        if modelos_treinados[tipo] is None
+    ]
+    with tracing.span("train", models=len(tarefas)):
+        resultados = executar_modelos(tarefas, on_result=lambda chave, resultado: prevista(chave[2], resultado[1]))
+
+    versao = versao_dados(df_local)
+    for (_, _, tipo), (modelo_novo, _, _) in resultados.items():
+        modelos_treinados[tipo] = modelo_novo
+        with tracing.span("model_save"):
+            registry.put(lat, lon, tipo, modelos_treinados[tipo], versao)
+        tracing.incrementar("app_model_retrains_total", ajuda="Modelos (re)treinados, por motivo",
+                            variable=tipo, reason="new_cell" if celula_nova else "missing_model")
+    if resultados:
+        # Modelos novos tornam as previsões antigas desta localização obsoletas
+        # e o horizonte completo da célula é recalculado para o armazenamento colunar
+        invalidar_localizacao(lat, lon)
+        agendar_gravacao(lat, lon, modelos_treinados, ds, versao)
+
+    return {tipo: forecasts[tipo] for tipo in VARIAVEIS}
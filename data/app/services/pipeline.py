@@ -0,0 +1,108 @@
+from app.services.collect_api_giovanni import colect_variable_groups
+from app.services.transform import transform
+from app.services.modelos import modelo, janela_previsao, build_forecast_json
+from app.services.forecast_cache import buscar_previsao, guardar_previsao
+from app.services import forecast_store, history_store, tracing
+from app.utils.grid import snap_to_grid
+from app.utils.collect_last_date_last_update_giovanni import ler_ultima_atualizacao
+from app.config_env import Config
+
+TIME_START = Config.GIOVANNI_TIME_START
+LISTA_MERRA = ['M2I1NXLFO_5_12_4_QLML', 'M2I1NXLFO_5_12_4_TLML', 'M2I1NXLFO_5_12_4_SPEEDLML']
+LISTA_MERRA2 = ['M2T1NXFLX_5_12_4_PRECTOTCORR', 'M2T1NXSLV_5_12_4_TQV']
+
+
+def _contar_cache(cache, acerto):
+    tracing.incrementar("app_cache_requests_total", ajuda="Consultas aos caches, por resultado",
+                        cache=cache, result="hit" if acerto else "miss")
+
+
+def time_end_atual():
+    """Fim da janela coletada: a última atualização do Giovanni já incorporada."""
+    return ler_ultima_atualizacao().strftime("%Y-%m-%dT%H:%M:%S")
+
+
+def carregar_historico(lat, lon, etapa=None, on_progress=None):
+    """
+    Histórico transformado da célula: o local (mantido em dia pelo refresh),
+    que dispensa coleta e transformação, ou então coletado do Giovanni.
+    """
+    with tracing.span("history_load"):
+        df_final = history_store.ler(lat, lon)
+    _contar_cache("history_store", df_final is not None)
+    if df_final is not None:
+        return df_final
+
+    # 1. Collect Data
+    if etapa:
+        etapa("collect")
+    with tracing.span("collect"):
+        time_end = time_end_atual()
+        df_merra, df_merra2 = colect_variable_groups([LISTA_MERRA, LISTA_MERRA2], lat, lon, TIME_START, time_end,
+                                                    progress=on_progress)
+
+    # 2. Transform Data
+    if etapa:
+        etapa("transform")
+    with tracing.span("transform"):
+        return transform(df_merra, df_merra2)
+
+
+def executar_pipeline(lat, lon, date, on_stage=None, inicio=None, fim=None, intervalos=True,
+                      on_progress=None, on_variable=None):
+    """
+    Executa o pipeline completo (cache -> coleta -> transformação -> modelos)
+    para uma localização e data/hora. O ponto é primeiro levado ao centro da
+    célula da grade MERRA-2, que é a chave de todas as etapas.
+
+    Args:
+        lat (float): Latitude pedida
+        lon (float): Longitude pedida
+        date (str): Data/hora de interesse
+        on_stage (callable|None): Chamado com o nome de cada etapa ao iniciá-la
+        on_progress (callable|None): Chamado a cada variável baixada do Giovanni,
+            com (variavel, concluidas, total, erro)
+        on_variable (callable|None): Chamado com (tipo, bloco JSON) assim que
+            cada variável é prevista; previsões vindas de cache não passam por aqui
+        inicio, fim (str|None): Janela prevista; por padrão, o dia de `date`
+        intervalos (bool): Se False, não calcula os intervalos de confiança
+    Returns:
+        tuple[dict, bool]: (JSON da previsão, se veio do cache)
+    """
+    def etapa(nome):
+        if on_stage:
+            on_stage(nome)
+
+    lat, lon = snap_to_grid(lat, lon)
+    padrao = inicio is None and fim is None and intervalos
+
+    with tracing.span("pipeline"):
+        # 0. Previsão já calculada (memória do processo ou tabela 'previsoes');
+        # só o modo padrão (dia inteiro, com intervalos) fica nesse cache.
+        # Depois, o horizonte já gravado da célula: leitura direta, sem carregar modelos
+        etapa("cache")
+        with tracing.span("cache"):
+            cached = buscar_previsao(lat, lon, date) if padrao else None
+            forecasts = None
+            if cached is None:
+                forecasts = forecast_store.ler_janela(lat, lon, janela_previsao(date, inicio, fim), intervalos)
+                _contar_cache("forecast_store", forecasts is not None)
+        if cached is not None:
+            etapa("done")
+            return cached, True
+        if forecasts is not None:
+            with tracing.span("json_build"):
+                forecast = build_forecast_json(date, forecasts, lat, lon)
+            if padrao:
+                guardar_previsao(lat, lon, date, forecast)
+            etapa("done")
+            return forecast, True
+
+        df_final = carregar_historico(lat, lon, etapa, on_progress)
+
+        # 3. Treino/previsão
+        etapa("model")
+        with tracing.span("model"):
+            forecast = modelo(df_final, date, inicio=inicio, fim=fim, intervalos=intervalos, on_variable=on_variable)
+        etapa("done")
+        return forecast, False
@@ -0,0 +1,130 @@
+import os
+import csv
+import json
+import time
+import argparse
+import multiprocessing
+from datetime import datetime
+from app.utils.grid import snap_to_grid, land_cells
+from app.services.pipeline import executar_pipeline
+
+
+def carregar_celulas(arquivo=None, bbox=None):
+    """
+    Lista de células a aquecer. Com `arquivo` (CSV com colunas lat,lon, em
+    ordem de prioridade) usa só esse subconjunto; senão usa todo o catálogo de
+    células sobre terra. `bbox` = (lat_min, lon_min, lat_max, lon_max).
+    """
+    if arquivo:
+        with open(arquivo, newline="") as f:
+            pontos = [(float(r["lat"]), float(r["lon"])) for r in csv.DictReader(f)]
+        celulas = list(dict.fromkeys(snap_to_grid(lat, lon) for lat, lon in pontos))
+    else:
+        celulas = land_cells()
+
+    if bbox:
+        lat_min, lon_min, lat_max, lon_max = bbox
+        celulas = [(a, o) for a, o in celulas if lat_min <= a <= lat_max and lon_min <= o <= lon_max]
+    return celulas
+
+
+class Checkpoint:
+    """
+    Registro em JSON Lines das células já processadas. Cada linha é gravada e
+    sincronizada no disco assim que a célula termina, então uma execução
+    interrompida pode ser retomada do ponto onde parou.
+    """
+
+    def __init__(self, caminho):
+        self.caminho = caminho
+        self.concluidas = set()
+        if os.path.exists(caminho):
+            with open(caminho) as f:
+                for linha in f:
+                    try:
+                        registro = json.loads(linha)
+                    except ValueError:
+                        continue  # Linha truncada por uma queda no meio da escrita
+                    if registro.get("status") == "ok":
+                        self.concluidas.add((registro["lat"], registro["lon"]))
+
+    def registrar(self, celula, status, **extra):
+        registro = dict(lat=celula[0], lon=celula[1], status=status, at=time.time(), **extra)
+        with open(self.caminho, "a") as f:
+            f.write(json.dumps(registro) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        if status == "ok":
+            self.concluidas.add(celula)
+
+
+def aquecer_celulas(celulas, datas, checkpoint_path):
+    """Coleta, armazena, treina e gera as previsões de cada célula, em sequência."""
+    checkpoint = Checkpoint(checkpoint_path)
+    for celula in celulas:
+        if celula in checkpoint.concluidas:
+            continue
+        inicio = time.time()
+        try:
+            for date in datas:
+                executar_pipeline(celula[0], celula[1], date)
+        except Exception as e:
+            print(f"Falha ao aquecer {celula}: {e}")
+            checkpoint.registrar(celula, "error", error=str(e))
+        else:
+            checkpoint.registrar(celula, "ok", seconds=round(time.time() - inicio, 1))
+
+
+def executar_prewarm(celulas, datas, checkpoint_path, workers=1, shard=0, num_shards=1, rate_budget=None):
+    """
+    Aquece as células do shard `shard` de `num_shards` (para dividir o
+    catálogo entre máquinas), repartindo-as entre `workers` processos locais.
+
+    O orçamento de requisições ao Giovanni (`rate_budget`, em req/s) é dividido
+    entre os processos, e o treino roda dentro de cada processo, já que o
+    paralelismo aqui é entre células.
+    """
+    celulas = celulas[shard::num_shards]
+    pendentes = [c for c in celulas if c not in Checkpoint(checkpoint_path).concluidas]
+    print(f"Shard {shard}/{num_shards}: {len(celulas)} células, {len(pendentes)} pendentes")
+    if not pendentes:
+        return
+
+    workers = max(1, min(workers, len(pendentes)))
+    if rate_budget:
+        os.environ["GIOVANNI_RATE_PER_SEC"] = str(rate_budget / workers)
+    os.environ["TRAINING_WORKERS"] = "0"
+    # O processo precisa terminar com o horizonte de cada célula já gravado
+    os.environ["FORECAST_STORE_ASYNC"] = "0"
+
+    # Sempre em processos novos (spawn): eles importam a configuração já com o
+    # ambiente ajustado acima, o que não vale para este processo.
+    contexto = multiprocessing.get_context("spawn")
+    processos = [
+        contexto.Process(target=aquecer_celulas, args=(pendentes[i::workers], datas, checkpoint_path))
+        for i in range(workers)
+    ]
+    for p in processos:
+        p.start()
+    for p in processos:
+        p.join()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pré-computa coleta, histórico, modelos e previsões das células da grade.")
+    parser.add_argument("--cells-file", help="CSV com colunas lat,lon (subconjunto prioritário, em ordem)")
+    parser.add_argument("--bbox", type=float, nargs=4, metavar=("LAT_MIN", "LON_MIN", "LAT_MAX", "LON_MAX"))
+    parser.add_argument("--dates", nargs="+", default=[datetime.now().strftime("%Y-%m-%dT12:00:00")],
+                        help="Datas/horas cujas previsões devem ficar prontas")
+    parser.add_argument("--checkpoint", default="prewarm_checkpoint.jsonl")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--shard", type=int, default=0)
+    parser.add_argument("--num-shards", type=int, default=1)
+    parser.add_argument("--rate", type=float, help="Orçamento total de requisições/s ao Giovanni")
+    args = parser.parse_args(argv)
+
+    celulas = carregar_celulas(args.cells_file, args.bbox)
+    executar_prewarm(
+        celulas, args.dates, args.checkpoint,
+        workers=args.workers, shard=args.shard, num_shards=args.num_shards, rate_budget=args.rate
+    )
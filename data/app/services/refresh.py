@@ -0,0 +1,121 @@
+import threading
+import pandas as pd
+from app.config_env import Config
+from app.services.collect_api_giovanni import colect_variable_groups
+from app.services.transform import transform
+from app.services.pipeline import TIME_START, LISTA_MERRA, LISTA_MERRA2
+from app.services.store_forecast import salvar_dados_historicos, buscar_celulas_com_historico, buscar_ultimo_historico
+from app.services.model_registry import registry
+from app.services.training_executor import VARIAVEIS, executar_modelos
+from app.services.forecast_cache import invalidar_localizacao
+from app.services.forecast_store import agendar_gravacao
+from app.services import history_store, tracing
+from app.services.climatology import atualizar_climatologia
+from app.services.modelos import versao_dados
+from app.utils.collect_last_date_last_update_giovanni import collect_last_update, ler_ultima_atualizacao, gravar_ultima_atualizacao
+
+
+def atualizar_celula(lat, lon, time_end):
+    """
+    Incorpora as horas novas de uma célula: busca só o trecho que falta no
+    cache de séries, acrescenta ao histórico o que ainda não está salvo,
+    retreina os modelos a partir dos parâmetros anteriores (warm start) e
+    invalida as previsões dependentes.
+
+    Returns:
+        int: Quantidade de horas novas incorporadas
+    """
+    df_merra, df_merra2 = colect_variable_groups([LISTA_MERRA, LISTA_MERRA2], lat, lon, TIME_START, time_end)
+    df_local = transform(df_merra, df_merra2)
+
+    ultimo = buscar_ultimo_historico(lat, lon)
+    novos = df_local if ultimo is None else df_local[df_local['Timestamp_Local'] > pd.Timestamp(ultimo)]
+    if novos.empty:
+        return 0
+    inseridas = salvar_dados_historicos(lat, lon, novos)
+    history_store.anexar(lat, lon, novos)
+    atualizar_climatologia(lat, lon)
+
+    ds = df_local['Timestamp_Local'].to_numpy(dtype='datetime64[ns]')
+    resultados = executar_modelos([
+        {
+            'chave': (lat, lon, tipo),
+            'ds': ds,
+            'y': df_local[coluna].to_numpy(dtype='float64'),
+            'future_ds': None,
+            'modelo': None,
+            'modelo_base': registry.get(lat, lon, tipo),
+        }
+        for tipo, coluna in VARIAVEIS.items()
+    ])
+    versao = versao_dados(df_local)
+    modelos = {}
+    for tipo in VARIAVEIS:
+        modelos[tipo], _, _ = resultados[(lat, lon, tipo)]
+        registry.put(lat, lon, tipo, modelos[tipo], versao)
+        tracing.incrementar("app_model_retrains_total", ajuda="Modelos (re)treinados, por motivo",
+                            variable=tipo, reason="refresh")
+
+    invalidar_localizacao(lat, lon)
+    agendar_gravacao(lat, lon, modelos, ds, versao)
+    return inseridas
+
+
+def executar_refresh():
+    """
+    Verifica se o Giovanni publicou dados além da última atualização já
+    incorporada e, se sim, atualiza todas as células com histórico salvo.
+
+    Returns:
+        dict: {(lat, lon): horas novas} das células atualizadas
+    """
+    anterior = ler_ultima_atualizacao()
+    atual = collect_last_update()
+    if atual <= anterior:
+        print(f"Sem dados novos no Giovanni (última atualização: {anterior}).")
+        return {}
+
+    print(f"Dados novos no Giovanni: {anterior} -> {atual}")
+    time_end = atual.strftime("%Y-%m-%dT%H:%M:%S")
+    atualizadas = {}
+    falhas = 0
+    for lat, lon in buscar_celulas_com_historico():
+        try:
+            atualizadas[(lat, lon)] = atualizar_celula(lat, lon, time_end)
+        except Exception as e:
+            falhas += 1
+            print(f"Falha no refresh de {lat},{lon}: {e}")
+
+    # Só avança a marca se todas as células foram atualizadas, para que as
+    # que falharam sejam tentadas de novo na próxima rodada.
+    if not falhas:
+        gravar_ultima_atualizacao(atual)
+    return atualizadas
+
+
+class RefreshScheduler(threading.Thread):
+    """Thread que roda executar_refresh a cada `intervalo` segundos."""
+
+    def __init__(self, intervalo):
+        super().__init__(name="refresh", daemon=True)
+        self.intervalo = intervalo
+        self._parar = threading.Event()
+
+    def run(self):
+        while not self._parar.wait(self.intervalo):
+            try:
+                executar_refresh()
+            except Exception as e:
+                print(f"Erro no refresh incremental: {e}")
+
+    def stop(self):
+        self._parar.set()
+
+
+def iniciar_scheduler():
+    """Inicia o refresh em segundo plano se REFRESH_INTERVAL estiver configurado."""
+    if Config.REFRESH_INTERVAL <= 0:
+        return None
+    scheduler = RefreshScheduler(Config.REFRESH_INTERVAL)
+    scheduler.start()
+    return scheduler
@@ -1,22 +1,8 @@
-import psycopg2
-import json
+import io
 import pickle
 from app.config_env import Config
-
-def get_db_connection():
-    DB_HOST = Config.DB_HOST or 'localhost'
-    DB_PORT = Config.DB_PORT or '5433'
-    DB_NAME = Config.DB_NAME or 'the-chess'
-    DB_USER = Config.DB_USER or 'postgres'
-    DB_PASS = Config.DB_PASS or 'rafa7887'
-    conn = psycopg2.connect(
-        host=DB_HOST,
-        port=DB_PORT,
-        dbname=DB_NAME,
-        user=DB_USER,
-        password=DB_PASS
-    )
-    return conn
+from app.services.get_db_connection import get_db_connection
+from app.services.forecast_format import compactar, expandir, codificar, decodificar
 
 def buscar_previsao_no_banco(lat, lon, date):
     conn = get_db_connection()
@@ -31,9 +17,25 @@ def buscar_previsao_no_banco(lat, lon, date):
     cursor.close()
     conn.close()
     if row and row[0]:
-        return json.loads(row[0])
+        # Forma binária compacta (BYTEA); linhas antigas em JSONB chegam como dict
+        return row[0] if isinstance(row[0], dict) else expandir(decodificar(row[0]))
     return None
 
+def apagar_previsoes_no_banco(lat, lon):
+    """Remove todas as previsões salvas de uma localização."""
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                DELETE FROM previsoes WHERE lat=%s AND lon=%s
+                """,
+                (lat, lon)
+            )
+        conn.commit()
+    finally:
+        conn.close()
+
 def salvar_previsao_no_banco(lat, lon, date, resultado_json):
     conn = get_db_connection()
     cursor = conn.cursor()
@@ -43,13 +45,22 @@ def salvar_previsao_no_banco(lat, lon, date, resultado_json):
         VALUES (%s, %s, %s, %s)
         ON CONFLICT (lat, lon, data) DO UPDATE SET resultado = EXCLUDED.resultado
         """,
-        (lat, lon, date, json.dumps(resultado_json))
+        (lat, lon, date, codificar(compactar(resultado_json, exato=True)))
     )
     conn.commit()
     cursor.close()
     conn.close()
 
-def salvar_modelo_no_banco(lat, lon, tipo, modelo):
+# Modelos globais não têm localização; a chave primária exige lat/lon, então
+# eles são gravados com esta coordenada sentinela.
+LAT_LON_GLOBAL = (-999.0, -999.0)
+
+def _local_modelo(lat, lon):
+    if lat is None or lon is None:
+        return LAT_LON_GLOBAL
+    return float(lat), float(lon)
+
+def salvar_modelo_no_banco(lat, lon, tipo, modelo, versao=''):
     """
     Serializa e salva o modelo Prophet treinado no banco de dados PostgreSQL.
     Para modelo global, lat/lon devem ser None.
@@ -58,22 +69,74 @@ def salvar_modelo_no_banco(lat, lon, tipo, modelo):
         lon (float|None): Longitude do local ou None para global
         tipo (str): Tipo do modelo (ex: 'temperature', 'humidity', etc)
         modelo (Prophet): Objeto Prophet treinado
+        versao (str): Versão dos dados usados no treino
+    Returns:
+        int: Tamanho em bytes do modelo serializado
     """
     modelo_serializado = pickle.dumps(modelo)
+    lat, lon = _local_modelo(lat, lon)
     conn = get_db_connection()
     try:
         with conn.cursor() as cur:
             cur.execute('''
-                INSERT INTO modelos_treinados (tipo, modelo_pickle)
-                VALUES (%s, %s)
-                ON CONFLICT (tipo)
-                DO UPDATE SET modelo_pickle = EXCLUDED.modelo_pickle;
-            ''', (tipo, modelo_serializado))
+                INSERT INTO modelos_treinados (lat, lon, tipo, versao, modelo_pickle)
+                VALUES (%s, %s, %s, %s, %s)
+                ON CONFLICT (lat, lon, tipo, versao)
+                DO UPDATE SET modelo_pickle = EXCLUDED.modelo_pickle, treinado_em = now();
+            ''', (lat, lon, tipo, versao, modelo_serializado))
         conn.commit()
     finally:
         conn.close()
+    return len(modelo_serializado)
+
+def buscar_modelo_serializado(lat, lon, tipo, versao=None):
+    """
+    Busca o modelo serializado de (lat, lon, tipo). Sem versão, retorna o
+    treinado mais recentemente.
+    Returns:
+        tuple[bytes, str] ou None: (pickle do modelo, versão)
+    """
+    lat, lon = _local_modelo(lat, lon)
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cur:
+            if versao is None:
+                cur.execute('''
+                    SELECT modelo_pickle, versao FROM modelos_treinados
+                    WHERE lat = %s AND lon = %s AND tipo = %s
+                    ORDER BY treinado_em DESC
+                    LIMIT 1
+                ''', (lat, lon, tipo))
+            else:
+                cur.execute('''
+                    SELECT modelo_pickle, versao FROM modelos_treinados
+                    WHERE lat = %s AND lon = %s AND tipo = %s AND versao = %s
+                ''', (lat, lon, tipo, versao))
+            result = cur.fetchone()
+            if result and result[0]:
+                return bytes(result[0]), result[1]
+    finally:
+        conn.close()
+    return None
+
+def buscar_versao_modelo(lat, lon, tipo):
+    """Versão do modelo de (lat, lon, tipo) treinado mais recentemente, sem carregá-lo (None se não há)."""
+    lat, lon = _local_modelo(lat, lon)
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute('''
+                SELECT versao FROM modelos_treinados
+                WHERE lat = %s AND lon = %s AND tipo = %s
+                ORDER BY treinado_em DESC
+                LIMIT 1
+            ''', (lat, lon, tipo))
+            result = cur.fetchone()
+    finally:
+        conn.close()
+    return result[0] if result else None
 
-def buscar_modelo_no_banco(lat, lon, tipo):
+def buscar_modelo_no_banco(lat, lon, tipo, versao=None):
     """
     Busca e desserializa o modelo Prophet treinado do banco de dados PostgreSQL.
     Para modelo global, lat/lon devem ser None.
@@ -81,47 +144,107 @@ def buscar_modelo_no_banco(lat, lon, tipo):
         lat (float|None): Latitude do local ou None para global
         lon (float|None): Longitude do local ou None para global
         tipo (str): Tipo do modelo (ex: 'temperature', 'humidity', etc)
+        versao (str|None): Versão dos dados; None para a mais recente
     Returns:
         Prophet ou None: Objeto Prophet treinado ou None se não encontrado
     """
+    result = buscar_modelo_serializado(lat, lon, tipo, versao)
+    if result:
+        return pickle.loads(result[0])
+    return None
+
+def buscar_celulas_com_historico():
+    """Lista (lat, lon) de todas as localizações com histórico salvo."""
     conn = get_db_connection()
     try:
         with conn.cursor() as cur:
-            cur.execute('''
-                SELECT modelo_pickle FROM modelos_treinados
-                WHERE tipo = %s
-            ''', (tipo,))
-            result = cur.fetchone()
-            if result and result[0]:
-                return pickle.loads(result[0])
+            cur.execute("SELECT DISTINCT lat, lon FROM historico_localizacao")
+            return [(float(lat), float(lon)) for lat, lon in cur.fetchall()]
     finally:
         conn.close()
-    return None
 
-def salvar_dados_historicos(lat, lon, df_local):
+def buscar_ultimo_historico(lat, lon):
+    """Último timestamp_local salvo para a localização, ou None."""
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                SELECT MAX(timestamp_local) FROM historico_localizacao WHERE lat=%s AND lon=%s
+                """,
+                (lat, lon)
+            )
+            row = cur.fetchone()
+            return row[0] if row else None
+    finally:
+        conn.close()
+
+# Colunas do DataFrame na ordem da tabela historico_localizacao
+COLUNAS_HISTORICO = ['Timestamp_Local', 'TLML', 'QLML', 'SPEEDLML', 'PRECTOTCORR', 'TQV']
+
+def salvar_dados_historicos(lat, lon, df_local, batch_size=None, progress=None):
     """
     Salva os dados históricos de uma localização na tabela 'historico_localizacao'.
-    Cada linha do DataFrame é inserida como um registro.
+    O DataFrame é enviado em lotes via COPY para uma tabela temporária e depois
+    inserido de uma vez com um único INSERT ... SELECT (ON CONFLICT DO NOTHING).
+    Args:
+        lat (float): Latitude do local
+        lon (float): Longitude do local
+        df_local (pd.DataFrame): Dados transformados do local
+        batch_size (int|None): Linhas por lote do COPY (padrão: Config.HISTORICO_BATCH_SIZE)
+        progress (callable|None): Chamado como progress(linhas_enviadas, total) após cada lote
+    Returns:
+        int: Quantidade de linhas novas inseridas
     """
+    batch_size = batch_size or Config.HISTORICO_BATCH_SIZE
+    df = df_local.reindex(columns=COLUNAS_HISTORICO)
+    total = len(df)
+
     conn = get_db_connection()
-    cursor = conn.cursor()
-    for _, row in df_local.iterrows():
-        cursor.execute(
-            """
-            INSERT INTO historico_localizacao (lat, lon, timestamp_local, tlml, qlml, speedlml, prectotcorr, tqv)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-            ON CONFLICT (lat, lon, timestamp_local) DO NOTHING
-            """,
-            (
-                row['lat'], row['lon'], row['Timestamp_Local'],
-                row.get('TLML'), row.get('QLML'), row.get('SPEEDLML'),
-                row.get('PRECTOTCORR'), row.get('TQV')
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                CREATE TEMP TABLE historico_staging (
+                    timestamp_local TIMESTAMP,
+                    tlml FLOAT,
+                    qlml FLOAT,
+                    speedlml FLOAT,
+                    prectotcorr FLOAT,
+                    tqv FLOAT
+                ) ON COMMIT DROP
+                """
             )
-        )
-    conn.commit()
-    cursor.close()
-    conn.close()
+            for inicio in range(0, total, batch_size):
+                buffer = io.StringIO()
+                df.iloc[inicio:inicio + batch_size].to_csv(
+                    buffer, header=False, index=False, na_rep='', date_format='%Y-%m-%d %H:%M:%S'
+                )
+                buffer.seek(0)
+                cur.copy_expert(
+                    """
+                    COPY historico_staging (timestamp_local, tlml, qlml, speedlml, prectotcorr, tqv)
+                    FROM STDIN WITH (FORMAT csv)
+                    """,
+                    buffer
+                )
+                if progress:
+                    progress(min(inicio + batch_size, total), total)
 
-# No modelo.py, após filtrar df_local, chame:
-# salvar_dados_historicos(lat, lon, df_local)
-# Só retreine o modelo se df_local tiver dados novos (compare com o histórico)
+            cur.execute(
+                """
+                INSERT INTO historico_localizacao (lat, lon, timestamp_local, tlml, qlml, speedlml, prectotcorr, tqv)
+                SELECT %s, %s, timestamp_local, tlml, qlml, speedlml, prectotcorr, tqv
+                FROM historico_staging
+                ON CONFLICT (lat, lon, timestamp_local) DO NOTHING
+                """,
+                (lat, lon)
+            )
+            inseridas = cur.rowcount
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+    return inseridas
@@ -0,0 +1,138 @@
+import json
+import time
+import uuid
+import threading
+import contextvars
+from contextlib import contextmanager
+from app.config_env import Config
+
+# Limites (s) dos buckets dos histogramas de duração: de consultas rápidas ao
+# banco até treinos e coletas de vários minutos.
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+_lock = threading.Lock()
+_contadores = {}    # (nome, labels) -> valor
+_histogramas = {}   # (nome, labels) -> [contagens por bucket..., +Inf, soma]
+_ajuda = {}
+
+_span_atual = contextvars.ContextVar("span_atual", default=None)
+
+
+def _labels(labels):
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def incrementar(nome, valor=1, ajuda=None, **labels):
+    """Soma `valor` ao contador `nome` com os labels dados."""
+    chave = (nome, _labels(labels))
+    with _lock:
+        _contadores[chave] = _contadores.get(chave, 0) + valor
+        if ajuda:
+            _ajuda.setdefault(nome, ajuda)
+
+
+def observar(nome, segundos, ajuda=None, **labels):
+    """Registra uma duração no histograma `nome`."""
+    chave = (nome, _labels(labels))
+    with _lock:
+        histograma = _histogramas.get(chave)
+        if histograma is None:
+            histograma = _histogramas[chave] = [0] * (len(BUCKETS) + 1) + [0.0]
+        for i, limite in enumerate(BUCKETS):
+            if segundos <= limite:
+                histograma[i] += 1
+        histograma[len(BUCKETS)] += 1
+        histograma[-1] += segundos
+        if ajuda:
+            _ajuda.setdefault(nome, ajuda)
+
+
+class Span:
+    def __init__(self, nome, labels, pai):
+        self.nome = nome
+        self.labels = labels
+        self.trace_id = pai.trace_id if pai else uuid.uuid4().hex[:16]
+        self.pai = pai.nome if pai else None
+        self.inicio = time.perf_counter()
+        self.duracao = None
+        self.erro = None
+
+
+@contextmanager
+def span(nome, **labels):
+    """
+    Mede a duração de um trecho (etapa do pipeline, chamada ao Giovanni...) e
+    a registra no histograma `app_span_seconds{span=nome}`. Spans aninhados na
+    mesma thread compartilham o trace_id do span de fora. Spans mais lentos que
+    TRACE_SLOW_MS são impressos como uma linha JSON.
+    """
+    atual = Span(nome, labels, _span_atual.get())
+    token = _span_atual.set(atual)
+    try:
+        yield atual
+    except BaseException as e:
+        atual.erro = type(e).__name__
+        raise
+    finally:
+        _span_atual.reset(token)
+        atual.duracao = time.perf_counter() - atual.inicio
+        observar("app_span_seconds", atual.duracao, ajuda="Duração dos spans de cada etapa", span=nome,
+                 status="error" if atual.erro else "ok")
+        if Config.TRACE_SLOW_MS and atual.duracao * 1000 >= Config.TRACE_SLOW_MS:
+            print(json.dumps({
+                "trace_id": atual.trace_id, "span": nome, "parent": atual.pai,
+                "ms": round(atual.duracao * 1000, 1), "error": atual.erro, **atual.labels,
+            }, default=str))
+
+
+def _formatar_labels(labels, extra=()):
+    itens = list(labels) + list(extra)
+    if not itens:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in itens) + "}"
+
+
+def exportar_prometheus(extras=()):
+    """
+    Todas as métricas no formato texto do Prometheus. `extras` são tuplas
+    (nome, tipo, ajuda, {labels}, valor) de métricas lidas de outros módulos;
+    podem somar séries a uma métrica já registrada aqui.
+    """
+    with _lock:
+        contadores = dict(_contadores)
+        histogramas = {k: list(v) for k, v in _histogramas.items()}
+        ajuda = dict(_ajuda)
+
+    # As séries de uma mesma métrica precisam sair juntas, sob um único cabeçalho
+    familias = {}
+
+    def familia(nome, tipo, texto=None):
+        if nome not in familias:
+            familias[nome] = (tipo, texto or ajuda.get(nome), [])
+        return familias[nome][2]
+
+    for (nome, labels), valor in sorted(contadores.items()):
+        familia(nome, "counter").append(f"{nome}{_formatar_labels(labels)} {valor}")
+    for (nome, labels), valores in sorted(histogramas.items()):
+        linhas = familia(nome, "histogram")
+        for limite, contagem in zip(BUCKETS, valores):
+            linhas.append(f"{nome}_bucket{_formatar_labels(labels, [('le', limite)])} {contagem}")
+        linhas.append(f"{nome}_bucket{_formatar_labels(labels, [('le', '+Inf')])} {valores[len(BUCKETS)]}")
+        linhas.append(f"{nome}_sum{_formatar_labels(labels)} {valores[-1]}")
+        linhas.append(f"{nome}_count{_formatar_labels(labels)} {valores[len(BUCKETS)]}")
+    for nome, tipo, texto, labels, valor in extras:
+        familia(nome, tipo, texto).append(f"{nome}{_formatar_labels(_labels(labels))} {valor}")
+
+    saida = []
+    for nome, (tipo, texto, linhas) in familias.items():
+        if texto:
+            saida.append(f"# HELP {nome} {texto}")
+        saida.append(f"# TYPE {nome} {tipo}")
+        saida.extend(linhas)
+    return "\n".join(saida) + "\n"
+
+
+def limpar():
+    with _lock:
+        _contadores.clear()
+        _histogramas.clear()
@@ -0,0 +1,134 @@
+import zlib
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+from app.config_env import Config
+from app.services.engines import get_motor, motor_do_modelo
+
+# Variáveis previstas e a coluna correspondente no DataFrame transformado
+VARIAVEIS = {
+    "temperature": "TLML",
+    "humidity": "QLML",
+    "wind_speed": "SPEEDLML",
+    "rain": "PRECTOTCORR",
+    "water_vapor": "TQV",
+}
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _semente(chave):
+    # Semente estável por tarefa: o resultado não depende da ordem nem do worker
+    return (Config.TRAINING_SEED + zlib.crc32(repr(chave).encode())) % (2 ** 32)
+
+
+def prever(modelo, future_ds, intervalos=True):
+    """
+    Prevê só os instantes de `future_ds` com o motor do modelo. Sem
+    `intervalos`, devolve apenas ds/yhat.
+    """
+    return motor_do_modelo(modelo).prever(modelo, future_ds, intervalos)
+
+
+def _treinar_e_prever(chave, ds, y, future_ds, modelo, modelo_base=None, intervalos=True):
+    """
+    Roda no processo filho: treina o modelo (se não vier um pronto) e prevê
+    os instantes de `future_ds`. Recebe e devolve arrays em vez de DataFrames
+    completos para reduzir o custo de serialização entre processos.
+    Com `modelo_base`, o treino parte dos parâmetros dele (warm start).
+    """
+    np.random.seed(_semente(chave))
+    treinou = modelo is None
+    if treinou:
+        modelo = get_motor().treinar(ds, y, modelo_base)
+    forecast = None
+    if future_ds is not None:
+        forecast = prever(modelo, future_ds, intervalos)
+    return modelo, forecast, treinou
+
+
+def _executar_vetorizado(motor, argumentos, on_result=None):
+    """
+    Para motores vetorizados: treina de uma vez, no próprio processo, todas as
+    séries que compartilham os mesmos instantes (mesma matriz de regressão).
+    """
+    grupos = {}
+    for args in argumentos:
+        chave, ds, y, _, modelo, _, _ = args
+        if modelo is None:
+            ds = np.asarray(ds, dtype='datetime64[ns]')
+            grupos.setdefault(hash(ds.tobytes()), (ds, []))[1].append((chave, y))
+
+    treinados = {}
+    for ds, series in grupos.values():
+        Y = np.column_stack([np.asarray(y, dtype=np.float64) for _, y in series])
+        for (chave, _), modelo in zip(series, motor.treinar_lote(ds, Y)):
+            treinados[chave] = modelo
+
+    resultados = {}
+    for chave, _, _, future_ds, modelo, _, intervalos in argumentos:
+        treinou = modelo is None
+        modelo = treinados[chave] if treinou else modelo
+        forecast = prever(modelo, future_ds, intervalos) if future_ds is not None else None
+        resultados[chave] = (modelo, forecast, treinou)
+        if on_result:
+            on_result(chave, resultados[chave])
+    return resultados
+
+
+def get_executor():
+    """Pool de processos compartilhado para treino/previsão (None se desativado)."""
+    global _executor
+    if Config.TRAINING_WORKERS <= 0:
+        return None
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(
+                max_workers=Config.TRAINING_WORKERS,
+                mp_context=multiprocessing.get_context(Config.TRAINING_MP_CONTEXT)
+            )
+        return _executor
+
+
+def executar_modelos(tarefas, on_result=None):
+    """
+    Treina e/ou prevê vários modelos em paralelo no pool de processos.
+
+    Args:
+        tarefas (list[dict]): Cada tarefa tem 'chave' (identificador único,
+            ex: (lat, lon, tipo)), 'ds' e 'y' (arrays do histórico), 'future_ds'
+            (instantes a prever ou None), 'modelo' (modelo já treinado ou None)
+            e, opcionalmente, 'modelo_base' (modelo anterior para warm start) e
+            'intervalos' (False para prever sem yhat_lower/yhat_upper)
+        on_result (callable|None): Chamado com (chave, resultado) assim que
+            cada tarefa termina, na ordem de conclusão
+    Returns:
+        dict: chave -> (modelo, forecast, treinou), na ordem das tarefas
+    """
+    if not tarefas:
+        return {}
+    argumentos = [
+        (t['chave'], t.get('ds'), t.get('y'), t.get('future_ds'), t.get('modelo'), t.get('modelo_base'), t.get('intervalos', True))
+        for t in tarefas
+    ]
+    motor = get_motor()
+    if motor.vetorizado:
+        return _executar_vetorizado(motor, argumentos, on_result)
+
+    executor = get_executor()
+    if executor is None:
+        resultados = {}
+        for args in argumentos:
+            resultados[args[0]] = _treinar_e_prever(*args)
+            if on_result:
+                on_result(args[0], resultados[args[0]])
+        return resultados
+
+    futuros = {executor.submit(_treinar_e_prever, *args): args[0] for args in argumentos}
+    if on_result:
+        for futuro in as_completed(futuros):
+            on_result(futuros[futuro], futuro.result())
+    concluidos = {chave: futuro for futuro, chave in futuros.items()}
+    return {args[0]: concluidos[args[0]].result() for args in argumentos}
@@ -1,21 +1,25 @@
 import pandas as pd
 from datetime import timedelta
-from ..utils.LatLonToTimeZone import colect_timezone
+from ..utils.LatLonToTimeZone import to_local_time
+from .align import align_series, frame_location
 
 def transform(df_merra,df_merra2):
-    df_merra2['Timestamp'] = pd.to_datetime(df_merra2['Timestamp']) - timedelta(minutes=30)
-    
-    df_completed = pd.merge(df_merra, df_merra2, on="Timestamp", how="left")
-    df_completed = df_completed.drop(columns=["lat_y", "lon_y"])
-    df_completed = df_completed.rename(columns={"lat_x": "lat", "lon_x": "lon"})
-    
-    df_completed['TLML'] = df_completed['TLML'].apply(lambda x: x - 273.15)
-    df_completed['SPEEDLML'] = df_completed['SPEEDLML'].apply(lambda x: x * 3.6)
-    timezone = colect_timezone(df_completed['lat'][0],df_completed['lon'][0]) 
-    df_completed['Timestamp_Local'] = df_completed.apply(
-    lambda row: row['Timestamp'] + timezone,
-    axis=1
-    )
-    print('Sucesso Transformação')
-    print(df_completed)
+    df_merra2 = df_merra2.assign(Timestamp=pd.to_datetime(df_merra2['Timestamp']) - timedelta(minutes=30))
+
+    # Eixo de tempo do MERRA (instantâneo); horas sem MERRA-2 ficam como NaN
+    lat, lon = frame_location(df_merra)
+    df_completed = align_series([df_merra, df_merra2], how="left", lat=lat, lon=lon)
+
+    # Corta no último horário que os dois produtos já têm: o MERRA-2 (meia hora
+    # deslocado, e às vezes publicado depois) deixaria as horas finais sem
+    # PRECTOTCORR/TQV, e o histórico salvo só cresce depois da última hora,
+    # então esses buracos nunca seriam preenchidos por um refresh.
+    if not df_merra.empty and not df_merra2.empty:
+        fim = min(pd.to_datetime(df_merra['Timestamp']).max(), df_merra2['Timestamp'].max())
+        df_completed = df_completed[df_completed['Timestamp'] <= fim].reset_index(drop=True)
+
+    df_completed['TLML'] = df_completed['TLML'] - 273.15
+    df_completed['SPEEDLML'] = df_completed['SPEEDLML'] * 3.6
+    # Conversão por data (com horário de verão), e não pelo offset de hoje
+    df_completed['Timestamp_Local'] = to_local_time(df_completed['Timestamp'], lat, lon)
     return df_completed
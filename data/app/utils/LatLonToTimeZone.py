@@ -1,10 +1,16 @@
+from functools import lru_cache
 from tzfpy import get_tz
 from zoneinfo import ZoneInfo
 from datetime import datetime, timezone
 import pandas as pd
 
+@lru_cache(maxsize=4096)
+def get_timezone_name(lat, lon):
+    """Nome IANA do fuso de (lat, lon); pontos sem fuso (oceano) caem em UTC."""
+    return get_tz(lon, lat) or "UTC"
+
 def colect_timezone(lat,lon):
-    tz = get_tz(lon, lat)
+    tz = get_timezone_name(lat, lon)
 
     now = datetime.now(timezone.utc)
     now = now.replace(tzinfo=ZoneInfo(tz))
@@ -12,4 +18,12 @@ def colect_timezone(lat,lon):
     td = ZoneInfo(tz).utcoffset(now)
     return td
 
+def to_local_time(timestamps, lat, lon):
+    """
+    Converte uma série de timestamps UTC (naive) para o horário local de
+    (lat, lon) de uma vez, respeitando o horário de verão de cada data.
+    Retorna timestamps naive no horário de parede local.
+    """
+    tz = get_timezone_name(lat, lon)
+    return timestamps.dt.tz_localize("UTC").dt.tz_convert(tz).dt.tz_localize(None)
 
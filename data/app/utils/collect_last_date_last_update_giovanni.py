@@ -1,89 +1,68 @@
-import pandas as pd
 import os
-from dotenv import load_dotenv
-from sqlalchemy import create_engine, text
-from sqlalchemy.exc import SQLAlchemyError
+import json
+import pandas as pd
+from app.config_env import Config
+from app.services.collect_api_giovanni import call_time_series, parse_csv
 
-# Sua função original para obter a data de referência local
-def collect_last_update():
-    """Retorna a data de referência para comparação."""
-    return pd.to_datetime('2025-09-01')
+# Série usada para sondar até quando o Giovanni já publicou dados
+VARIAVEL_REFERENCIA = 'M2I1NXLFO_5_12_4_TLML'
+PONTO_REFERENCIA = (-16.5, -46.875)
+JANELA_SONDAGEM = pd.Timedelta(days=45)
 
-def check_and_compare_last_data_view():
-    """
-    Verifica se a view 'last_data' existe no PostgreSQL.
-    Se existir, compara seu valor com a data de 'collect_last_update'.
-    """
-    # Carrega as variáveis de ambiente do arquivo .env
-    load_dotenv()
+def _arquivo_ultima_atualizacao():
+    return os.path.join(Config.GIOVANNI_CACHE_DIR, "last_update.json")
 
-    # Monta a string de conexão a partir das variáveis de ambiente
+def ler_ultima_atualizacao():
+    """Último instante (UTC) com dados no Giovanni já incorporado pelo refresh."""
     try:
-        db_url = (
-            f"postgresql+psycopg2://{os.getenv('DB_USER')}:{os.getenv('DB_PASSWORD')}@"
-            f"{os.getenv('DB_HOST')}:{os.getenv('DB_PORT')}/{os.getenv('DB_NAME')}"
-        )
-        engine = create_engine(db_url)
-    except Exception as e:
-        print(f"Erro ao montar a URL de conexão. Verifique suas variáveis de ambiente. Erro: {e}")
-        return
+        with open(_arquivo_ultima_atualizacao()) as f:
+            return pd.Timestamp(json.load(f)["last_update"])
+    except (OSError, ValueError, KeyError):
+        return pd.Timestamp(Config.GIOVANNI_TIME_END)
 
-    view_name = 'last_data'
-    schema_name = 'public' # Altere se a sua view estiver em um schema diferente
+def gravar_ultima_atualizacao(timestamp):
+    caminho = _arquivo_ultima_atualizacao()
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    tmp = f"{caminho}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump({"last_update": pd.Timestamp(timestamp).isoformat()}, f)
+    os.replace(tmp, caminho)
 
+def collect_last_update():
+    """
+    Retorna o último instante (UTC) com dados publicados no Giovanni, sondando
+    uma janela recente de uma série de referência. Se a consulta falhar,
+    retorna a última atualização já conhecida.
+    """
+    fim = pd.Timestamp.utcnow().tz_localize(None).floor('h')
+    inicio = fim - JANELA_SONDAGEM
     try:
-        # Usa um gerenciador de contexto para garantir que a conexão seja fechada
-        with engine.connect() as connection:
-            print("Conexão com o banco de dados PostgreSQL bem-sucedida.")
-
-            # 1. Query para verificar se a view existe no information_schema
-            check_view_query = text(f"""
-                SELECT EXISTS (
-                    SELECT 1
-                    FROM information_schema.views
-                    WHERE table_schema = '{schema_name}'
-                    AND table_name = '{view_name}'
-                );
-            """)
-            
-            view_exists = connection.execute(check_view_query).scalar()
-
-            # 2. Lógica condicional baseada na existência da view
-            if view_exists:
-                print(f"A view '{view_name}' foi encontrada no schema '{schema_name}'.")
-
-                # 3. Busca o valor da view
-                select_value_query = text(f"SELECT * FROM {schema_name}.{view_name};")
-                df_view = pd.read_sql(select_value_query, connection)
-
-                if df_view.empty:
-                    print(f"A view '{view_name}' existe, mas está vazia. Não há dados para comparar.")
-                    return
-
-                # Pega o valor da primeira linha e primeira coluna da view
-                db_date_value = df_view.iloc[0, 0]
-                db_timestamp = pd.to_datetime(db_date_value)
-                
-                # Pega o valor da função local
-                local_timestamp = collect_last_update()
-                
-                print(f"Data no banco de dados: {db_timestamp.strftime('%Y-%m-%d')}")
-                print(f"Data na função local:    {local_timestamp.strftime('%Y-%m-%d')}")
-
-                # 4. Compara os valores
-                if db_timestamp == local_timestamp:
-                    print("\nResultado: As datas são IGUAIS.")
-                else:
-                    print("\nResultado: As datas são DIFERENTES.")
+        ts = call_time_series(
+            PONTO_REFERENCIA[0], PONTO_REFERENCIA[1],
+            inicio.strftime("%Y-%m-%dT%H:%M:%S"), fim.strftime("%Y-%m-%dT%H:%M:%S"),
+            VARIAVEL_REFERENCIA
+        )
+        _, df = parse_csv(ts)
+        if not df.empty:
+            return pd.Timestamp(df['Timestamp'].max())
+    except Exception as e:
+        print(f"Não foi possível sondar a última atualização do Giovanni: {e}")
+    return ler_ultima_atualizacao()
 
-            else:
-                print(f"A view '{view_name}' NÃO foi encontrada no schema '{schema_name}'.")
+def comparar_ultima_atualizacao():
+    """
+    Compara a última atualização já incorporada pelo refresh com a última
+    publicada no Giovanni (ambas em UTC).
 
-    except SQLAlchemyError as e:
-        print(f"Ocorreu um erro de banco de dados: {e}")
-    except Exception as e:
-        print(f"Ocorreu um erro inesperado: {e}")
+    Returns:
+        dict: {'incorporated': ..., 'giovanni': ..., 'has_new_data': bool}
+    """
+    incorporada = ler_ultima_atualizacao()
+    giovanni = collect_last_update()
+    print(f"Última atualização incorporada: {incorporada}")
+    print(f"Última atualização no Giovanni: {giovanni}")
+    return {"incorporated": incorporada, "giovanni": giovanni, "has_new_data": giovanni > incorporada}
 
 # --- Execução do Script ---
 if __name__ == "__main__":
-    check_and_compare_last_data_view()
\ No newline at end of file
+    comparar_ultima_atualizacao()
\ No newline at end of file
@@ -0,0 +1,45 @@
+import math
+
+# Grade nativa do MERRA-2 retornada pelo Giovanni (a mesma usada em
+# mapeamento_pontos_coletaveis.mapeamento)
+LAT_STEP = 0.5
+LON_STEP = 0.625
+N_LON = int(round(360 / LON_STEP))
+
+def snap_to_grid(lat, lon):
+    """
+    Retorna o centro da célula da grade MERRA-2 mais próxima de (lat, lon).
+    Coleta, armazenamento e caches usam esta chave, para que pontos vizinhos
+    compartilhem dados, modelos e previsões.
+
+    Raises:
+        ValueError: lat fora de [-90, 90] ou coordenada não finita
+    """
+    lat, lon = float(lat), float(lon)
+    if not (math.isfinite(lat) and math.isfinite(lon)):
+        raise ValueError(f"lat/lon must be finite numbers, got ({lat}, {lon})")
+    if not -90.0 <= lat <= 90.0:
+        raise ValueError(f"lat must be within [-90, 90], got {lat}")
+    i = math.floor((lat + 90.0) / LAT_STEP + 0.5)
+    lat_c = -90.0 + i * LAT_STEP
+
+    lon = (lon + 180.0) % 360.0 - 180.0
+    j = math.floor((lon + 180.0) / LON_STEP + 0.5) % N_LON
+    lon_c = -180.0 + j * LON_STEP
+    return round(lat_c, 4), round(lon_c, 4)
+
+def land_cells(lat_min=-60.0):
+    """
+    Células da grade MERRA-2 sobre terra, sem a Antártica (lat < lat_min).
+    Mesmo catálogo de mapeamento_pontos_coletaveis.mapeamento, em ordem de
+    latitude e longitude e sem repetir lon=180 (igual a -180).
+    """
+    import numpy as np
+    from roaring_landmask import RoaringLandmask
+
+    lat_l = np.arange(-90, 90 + LAT_STEP, LAT_STEP)
+    lon_l = -180.0 + np.arange(N_LON) * LON_STEP
+    lat_c, lon_c = (a.ravel() for a in np.meshgrid(lat_l[lat_l >= lat_min], lon_l, indexing="ij"))
+
+    is_land = RoaringLandmask.new().contains_many(lon_c, lat_c)
+    return [(round(float(a), 4), round(float(o), 4)) for a, o in zip(lat_c[is_land], lon_c[is_land])]
@@ -0,0 +1,89 @@
+"""
+Comparação de precisão e latência entre os motores de previsão (Prophet x
+regressão harmônica) sobre o histórico gravado de uma célula: treina com tudo
+menos os últimos dias e mede o erro nesses dias reservados.
+
+Uso (a partir de data/):
+    python -m benchmarks.bench_engines --lat -16.5 --lon -46.875 [--holdout-days 30]
+    python -m benchmarks.bench_engines --synthetic-days 365
+"""
+import argparse
+import time
+import numpy as np
+import pandas as pd
+from app.services import history_store
+from app.services.engines import MOTORES
+from app.services.training_executor import VARIAVEIS
+from app.utils.grid import snap_to_grid
+
+
+def historico_sintetico(dias, seed=0):
+    rng = np.random.default_rng(seed)
+    ds = pd.date_range("2020-01-01", periods=24 * dias, freq="h")
+    h = np.arange(len(ds))
+    diario = np.sin(h * 2 * np.pi / 24)
+    anual = np.sin(h * 2 * np.pi / (24 * 365.25))
+    df = pd.DataFrame({
+        "Timestamp_Local": ds,
+        "TLML": 22 + 6 * diario + 4 * anual + rng.normal(0, 1, len(ds)),
+        "QLML": 0.012 + 0.002 * diario + 0.003 * anual + rng.normal(0, 5e-4, len(ds)),
+        "SPEEDLML": 12 + 3 * diario + rng.gamma(2, 1.5, len(ds)),
+        "PRECTOTCORR": np.clip(rng.normal(0, 2e-5, len(ds)) + 1e-5 * (anual > 0), 0, None),
+        "TQV": 30 + 8 * anual + rng.normal(0, 2, len(ds)),
+    })
+    return df.astype({c: np.float32 for c in VARIAVEIS.values()})
+
+
+def avaliar(motor, ds_treino, Y_treino, ds_teste, Y_teste):
+    inicio = time.perf_counter()
+    modelos = motor.treinar_lote(ds_treino, Y_treino)
+    t_treino = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    previsoes = [motor.prever(m, ds_teste, intervalos=True) for m in modelos]
+    t_previsao = time.perf_counter() - inicio
+
+    erros = []
+    for j, forecast in enumerate(previsoes):
+        erro = forecast['yhat'].to_numpy() - Y_teste[:, j]
+        dentro = (forecast['yhat_lower'].to_numpy() <= Y_teste[:, j]) & (Y_teste[:, j] <= forecast['yhat_upper'].to_numpy())
+        erros.append((np.nanmean(np.abs(erro)), np.sqrt(np.nanmean(erro ** 2)), dentro.mean()))
+    return t_treino, t_previsao, erros
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lat", type=float)
+    parser.add_argument("--lon", type=float)
+    parser.add_argument("--synthetic-days", type=int, default=365)
+    parser.add_argument("--holdout-days", type=int, default=30)
+    parser.add_argument("--engines", nargs="+", default=list(MOTORES))
+    args = parser.parse_args()
+
+    df = None
+    if args.lat is not None and args.lon is not None:
+        df = history_store.ler(*snap_to_grid(args.lat, args.lon))
+        if df is None:
+            parser.error("A célula não tem histórico gravado (rode o pipeline ou o pré-aquecimento antes)")
+    else:
+        df = historico_sintetico(args.synthetic_days)
+
+    corte = df['Timestamp_Local'].max() - pd.Timedelta(days=args.holdout_days)
+    treino, teste = df[df['Timestamp_Local'] <= corte], df[df['Timestamp_Local'] > corte]
+    colunas = list(VARIAVEIS.values())
+    ds_treino = treino['Timestamp_Local'].to_numpy(dtype='datetime64[ns]')
+    ds_teste = teste['Timestamp_Local'].to_numpy(dtype='datetime64[ns]')
+    Y_treino = treino[colunas].to_numpy(dtype=np.float64)
+    Y_teste = teste[colunas].to_numpy(dtype=np.float64)
+
+    print(f"Treino: {len(treino)} horas  teste: {len(teste)} horas  variáveis: {len(colunas)}")
+    for nome in args.engines:
+        t_treino, t_previsao, erros = avaliar(MOTORES[nome], ds_treino, Y_treino, ds_teste, Y_teste)
+        print(f"\n{nome}: treino {t_treino * 1000:9.1f} ms  previsão {t_previsao * 1000:9.1f} ms")
+        print(f"  {'variável':<12} {'MAE':>12} {'RMSE':>12} {'cobertura 95%':>14}")
+        for coluna, (mae, rmse, cobertura) in zip(colunas, erros):
+            print(f"  {coluna:<12} {mae:12.5g} {rmse:12.5g} {cobertura:14.1%}")
+
+
+if __name__ == "__main__":
+    main()
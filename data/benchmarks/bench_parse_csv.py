@@ -0,0 +1,57 @@
+"""
+Micro-benchmark do parse_csv: implementação original x atual.
+
+Uso (a partir de data/):
+    python -m benchmarks.bench_parse_csv [--payload arquivo.csv] [--repeat 5]
+"""
+import io
+import argparse
+import timeit
+import pandas as pd
+from app.services.collect_api_giovanni import parse_csv
+from benchmarks.payloads import load_payload
+
+
+def parse_csv_original(ts):
+    with io.StringIO(ts) as f:
+        headers = {}
+        for _ in range(13):
+            line = f.readline()
+            key, value = line.split(",", maxsplit=1)
+            headers[key] = value.strip()
+
+        df = pd.read_csv(
+            f,
+            header=1,
+            names=("Timestamp", headers["param_short_name"]),
+            converters={"Timestamp": pd.to_datetime}
+        )
+    return headers, df
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--payload", help="CSV gravado do Giovanni (padrão: sintético de 5 anos)")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    payload = load_payload(args.payload)
+    texto = payload.decode("utf-8")
+
+    _, df_old = parse_csv_original(texto)
+    _, df_new = parse_csv(payload)
+    assert len(df_old) == len(df_new)
+    assert (df_old["Timestamp"].values == df_new["Timestamp"].values).all()
+
+    # A versão original recebia response.text, então a decodificação entra na conta dela
+    t_old = min(timeit.repeat(lambda: parse_csv_original(payload.decode("utf-8")), number=1, repeat=args.repeat))
+    t_new = min(timeit.repeat(lambda: parse_csv(payload), number=1, repeat=args.repeat))
+
+    print(f"Linhas: {len(df_new)}  ({len(payload) / 1e6:.1f} MB)")
+    print(f"Original: {t_old * 1000:9.1f} ms  memória {df_old.memory_usage(deep=True).sum() / 1e6:.2f} MB")
+    print(f"Atual:    {t_new * 1000:9.1f} ms  memória {df_new.memory_usage(deep=True).sum() / 1e6:.2f} MB")
+    print(f"Speedup:  {t_old / t_new:9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+"""
+Benchmark ponta a ponta do /api/collect, com o Giovanni local
+(benchmarks.giovanni_stub) e, por padrão, o banco em memória
+(benchmarks.db_standin).
+
+Para cada número de clientes simultâneos (--clients 1 2 4 ...) roda três fases:
+    cold    caches, histórico e modelos vazios: coleta, transformação, treino...
+    models  histórico e modelos prontos, previsões descartadas: previsão + JSON
+    warm    tudo em cache
+e mostra, por fase, a latência das requisições, a vazão, o pico de memória do
+processo e o tempo gasto em cada etapa (somado entre as threads).
+
+Uso (a partir de data/):
+    python -m benchmarks.bench_pipeline --clients 1 2 4 --latency 0.2 --max-concurrent 5
+    python -m benchmarks.bench_pipeline --engine harmonic --time-start 2022-01-01T00:00:00
+    python -m benchmarks.bench_pipeline --db postgres   # usa o banco configurado no .env
+"""
+import os
+import time
+import shutil
+import argparse
+import resource
+import tempfile
+import threading
+import tracemalloc
+import functools
+import importlib
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+# Etapas medidas: nome -> (módulo, função) nos pontos em que o pipeline as chama
+ETAPAS = {
+    "collect": ("app.services.pipeline", "colect_variable_groups"),
+    "http": ("app.services.collect_api_giovanni", "call_time_series"),
+    "parse": ("app.services.collect_api_giovanni", "parse_csv"),
+    "transform": ("app.services.pipeline", "transform"),
+    "history_save": ("app.services.modelos", "salvar_dados_historicos"),
+    "history_store": ("app.services.history_store", "anexar"),
+    "train": ("app.services.modelos", "executar_modelos"),
+    "predict": ("app.services.modelos", "prever"),
+    "json_build": ("app.services.modelos", "build_forecast_json"),
+}
+
+# Pontos sobre terra, um por cliente (cada cliente consulta uma célula diferente)
+PONTOS = [
+    (-16.5, -46.875), (-23.5, -46.875), (-3.0, -60.0), (40.5, -74.375),
+    (51.5, 0.0), (35.5, 139.375), (-33.5, 151.25), (19.5, -99.375),
+]
+
+
+class Medidor:
+    """Acumula as durações das etapas, de forma segura entre threads."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.duracoes = defaultdict(list)
+
+    def registrar(self, etapa, segundos):
+        with self._lock:
+            self.duracoes[etapa].append(segundos)
+
+    def reiniciar(self):
+        with self._lock:
+            self.duracoes = defaultdict(list)
+
+    def instrumentar(self):
+        for etapa, (nome_modulo, funcao) in ETAPAS.items():
+            modulo = importlib.import_module(nome_modulo)
+            setattr(modulo, funcao, self._cronometrar(etapa, getattr(modulo, funcao)))
+
+    def _cronometrar(self, etapa, funcao):
+        @functools.wraps(funcao)
+        def medida(*args, **kwargs):
+            inicio = time.perf_counter()
+            try:
+                return funcao(*args, **kwargs)
+            finally:
+                self.registrar(etapa, time.perf_counter() - inicio)
+        return medida
+
+
+def configurar_ambiente(args, base):
+    """Ajusta a configuração (lida no import de app.config_env) antes de importar a aplicação."""
+    os.environ.update({
+        "GIOVANNI_URL": args.giovanni_url,
+        "TOKEN": "benchmark",
+        "GIOVANNI_TIME_START": args.time_start,
+        "GIOVANNI_TIME_END": args.time_end,
+        "GIOVANNI_CACHE_DIR": os.path.join(base, "giovanni"),
+        "HISTORY_STORE_DIR": os.path.join(base, "history"),
+        "FORECAST_STORE_DIR": os.path.join(base, "forecasts"),
+        "CLIMATOLOGY_DIR": os.path.join(base, "climatology"),
+        "TRAINING_WORKERS": str(args.training_workers),
+    })
+    if args.engine:
+        os.environ["FORECAST_ENGINE"] = args.engine
+
+
+def limpar_estado(base, celulas, banco):
+    """Estado frio: sem cache de séries, histórico, previsões nem modelos."""
+    from app.services.model_registry import registry
+    from app.services.forecast_cache import invalidar_localizacao
+    from app.services.forecast_store import aguardar_gravacoes
+    aguardar_gravacoes()
+    for celula in celulas:
+        registry.invalidate(*celula)
+        invalidar_localizacao(*celula)
+    for pasta in ("giovanni", "history", "forecasts", "climatology"):
+        shutil.rmtree(os.path.join(base, pasta), ignore_errors=True)
+    if banco is not None:
+        banco.limpar()
+
+
+def descartar_previsoes(celulas):
+    from app.services.forecast_cache import invalidar_localizacao
+    from app.services.forecast_store import aguardar_gravacoes
+    aguardar_gravacoes()
+    for celula in celulas:
+        invalidar_localizacao(*celula)
+
+
+def rodar_fase(app, pontos, requisicoes, data):
+    """Cada cliente (thread) faz `requisicoes` chamadas ao /api/collect para o seu ponto."""
+    latencias, erros = [], []
+    lock = threading.Lock()
+
+    def cliente(ponto):
+        client = app.test_client()
+        for _ in range(requisicoes):
+            inicio = time.perf_counter()
+            resposta = client.post("/api/collect", json={"lat": ponto[0], "lon": ponto[1], "datetime": data})
+            duracao = time.perf_counter() - inicio
+            with lock:
+                (latencias if resposta.status_code == 200 else erros).append(duracao)
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=len(pontos)) as executor:
+        list(executor.map(cliente, pontos))
+    return latencias, erros, time.perf_counter() - inicio
+
+
+def relatorio(fase, clientes, latencias, erros, total, medidor, memoria):
+    lat = np.array(latencias) if latencias else np.array([np.nan])
+    print(f"\n[{fase}] clientes={clientes} ok={len(latencias)} erros={len(erros)} "
+          f"tempo={total:.2f}s vazão={len(latencias) / total:.2f} req/s")
+    print(f"  latência: p50={np.nanpercentile(lat, 50):.3f}s p95={np.nanpercentile(lat, 95):.3f}s max={np.nanmax(lat):.3f}s")
+    print(f"  memória: pico RSS do processo={memoria['rss_mb']:.0f} MB"
+          + (f", pico tracemalloc da fase={memoria['traced_mb']:.0f} MB" if memoria.get('traced_mb') is not None else ""))
+    print(f"  {'etapa':<14} {'chamadas':>8} {'total (s)':>10} {'média (ms)':>11} {'p95 (ms)':>9}")
+    for etapa in ETAPAS:
+        duracoes = medidor.duracoes.get(etapa)
+        if not duracoes:
+            continue
+        d = np.array(duracoes)
+        print(f"  {etapa:<14} {len(d):>8} {d.sum():>10.2f} {d.mean() * 1000:>11.1f} {np.percentile(d, 95) * 1000:>9.1f}")
+
+
+def memoria_atual(usar_tracemalloc):
+    memoria = {"rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024}
+    if usar_tracemalloc:
+        memoria["traced_mb"] = tracemalloc.get_traced_memory()[1] / 2 ** 20
+        tracemalloc.reset_peak()
+    return memoria
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--requests", type=int, default=1, help="Requisições por cliente em cada fase")
+    parser.add_argument("--datetime", default="2025-10-15T12:00:00")
+    parser.add_argument("--db", choices=("memory", "postgres"), default="memory")
+    parser.add_argument("--engine", choices=("prophet", "harmonic"))
+    parser.add_argument("--training-workers", type=int, default=2)
+    parser.add_argument("--time-start", default="2024-01-01T00:00:00", help="Início do histórico coletado")
+    parser.add_argument("--time-end", default="2025-09-28T00:00:00")
+    parser.add_argument("--payload-dir", help="Payloads gravados do Giovanni (<variável>.csv)")
+    parser.add_argument("--latency", type=float, default=0.0, help="Latência do Giovanni local (s)")
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--max-concurrent", type=int, help="Limite de concorrência do Giovanni local (429 acima)")
+    parser.add_argument("--rate", type=float, help="Limite de requisições/s do Giovanni local (429 acima)")
+    parser.add_argument("--tracemalloc", action="store_true", help="Mede também o pico de alocações Python por fase")
+    args = parser.parse_args()
+
+    if max(args.clients) > len(PONTOS):
+        parser.error(f"No máximo {len(PONTOS)} clientes")
+
+    from benchmarks.giovanni_stub import GiovanniStub
+    stub = GiovanniStub(args.payload_dir, args.latency, args.jitter, args.max_concurrent, args.rate,
+                        time_start=args.time_start, time_end=args.time_end)
+    args.giovanni_url = stub.start()
+    base = tempfile.mkdtemp(prefix="bench_pipeline_")
+    configurar_ambiente(args, base)
+
+    # A aplicação só é importada depois do ambiente ajustado
+    from app import create_app
+    from app.utils.grid import snap_to_grid
+    banco = None
+    if args.db == "memory":
+        from benchmarks import db_standin
+        banco = db_standin.instalar()
+    medidor = Medidor()
+    medidor.instrumentar()
+    app = create_app()
+
+    if args.tracemalloc:
+        tracemalloc.start()
+    print(f"Giovanni local: {args.giovanni_url}  banco: {args.db}  histórico: {args.time_start} -> {args.time_end}")
+    try:
+        for clientes in args.clients:
+            pontos = PONTOS[:clientes]
+            celulas = [snap_to_grid(*p) for p in pontos]
+            for fase in ("cold", "models", "warm"):
+                if fase == "cold":
+                    limpar_estado(base, celulas, banco)
+                elif fase == "models":
+                    descartar_previsoes(celulas)
+                medidor.reiniciar()
+                memoria_atual(args.tracemalloc)
+                latencias, erros, total = rodar_fase(app, pontos, args.requests, args.datetime)
+                relatorio(fase, clientes, latencias, erros, total, medidor, memoria_atual(args.tracemalloc))
+        print(f"\nGiovanni local: {stub.metrics}")
+    finally:
+        stub.stop()
+        shutil.rmtree(base, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
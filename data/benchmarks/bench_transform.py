@@ -0,0 +1,81 @@
+"""
+Benchmark do transform: implementação original (apply linha a linha e offset
+fixo de hoje) x atual (vetorizada e com horário de verão), num frame de 50k linhas.
+
+Uso (a partir de data/):
+    python -m benchmarks.bench_transform [--rows 50000] [--lat 40.75 --lon -74.0]
+"""
+import argparse
+import timeit
+import numpy as np
+import pandas as pd
+from datetime import timedelta
+from app.services.align import align_series
+from app.services.transform import transform
+from app.utils.LatLonToTimeZone import colect_timezone
+
+
+def transform_original(df_merra, df_merra2, lat, lon):
+    df_merra = df_merra.assign(lat=lat, lon=lon)
+    df_merra2 = df_merra2.assign(lat=lat, lon=lon)
+    df_merra2['Timestamp'] = pd.to_datetime(df_merra2['Timestamp']) - timedelta(minutes=30)
+
+    df_completed = pd.merge(df_merra, df_merra2, on="Timestamp", how="left")
+    df_completed = df_completed.drop(columns=["lat_y", "lon_y"])
+    df_completed = df_completed.rename(columns={"lat_x": "lat", "lon_x": "lon"})
+
+    df_completed['TLML'] = df_completed['TLML'].apply(lambda x: x - 273.15)
+    df_completed['SPEEDLML'] = df_completed['SPEEDLML'].apply(lambda x: x * 3.6)
+    timezone = colect_timezone(df_completed['lat'][0], df_completed['lon'][0])
+    df_completed['Timestamp_Local'] = df_completed.apply(
+        lambda row: row['Timestamp'] + timezone,
+        axis=1
+    )
+    return df_completed
+
+
+def frames(rows, lat, lon):
+    rng = np.random.default_rng(0)
+    ts = pd.date_range("2020-01-01", periods=rows, freq="h")
+    df_merra = pd.DataFrame({
+        "Timestamp": ts,
+        "QLML": rng.random(rows, dtype=np.float32),
+        "TLML": (280 + rng.random(rows, dtype=np.float32)),
+        "SPEEDLML": rng.random(rows, dtype=np.float32),
+    })
+    df_merra2 = pd.DataFrame({
+        "Timestamp": ts + pd.Timedelta(minutes=30),
+        "PRECTOTCORR": rng.random(rows, dtype=np.float32),
+        "TQV": rng.random(rows, dtype=np.float32),
+    })
+    return df_merra, df_merra2
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--lat", type=float, default=40.75)
+    parser.add_argument("--lon", type=float, default=-74.0)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    df_merra, df_merra2 = frames(args.rows, args.lat, args.lon)
+    aligned = align_series([df_merra], lat=args.lat, lon=args.lon)
+    aligned2 = align_series([df_merra2], lat=args.lat, lon=args.lon)
+
+    old = transform_original(df_merra, df_merra2, args.lat, args.lon)
+    new = transform(aligned, aligned2)
+    shifted = (old["Timestamp_Local"].values != new["Timestamp_Local"].values).sum()
+
+    t_old = min(timeit.repeat(lambda: transform_original(df_merra, df_merra2, args.lat, args.lon), number=1, repeat=args.repeat))
+    t_new = min(timeit.repeat(lambda: transform(aligned, aligned2), number=1, repeat=args.repeat))
+
+    print(f"Linhas: {args.rows}  ponto: {args.lat},{args.lon}")
+    print(f"Original: {t_old * 1000:9.1f} ms")
+    print(f"Atual:    {t_new * 1000:9.1f} ms")
+    print(f"Speedup:  {t_old / t_new:9.1f}x")
+    print(f"Horas locais corrigidas pelo horário de verão: {shifted} ({shifted / args.rows:.0%})")
+
+
+if __name__ == "__main__":
+    main()
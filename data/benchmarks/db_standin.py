@@ -0,0 +1,109 @@
+"""
+Substituto em memória das tabelas do PostgreSQL (previsoes, modelos_treinados
+e historico_localizacao) para os benchmarks rodarem sem um banco.
+
+`instalar()` troca as funções de acesso ao banco nos módulos que as usam;
+os custos de serialização (pickle dos modelos, cópia do histórico) são
+mantidos, só a ida ao servidor é que some.
+"""
+import pickle
+import threading
+import pandas as pd
+from app.services import history_store
+from app.services.store_forecast import COLUNAS_HISTORICO, _local_modelo
+from app.services.forecast_format import compactar, expandir, codificar, decodificar
+
+
+class BancoEmMemoria:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.limpar()
+
+    def limpar(self):
+        with self._lock:
+            self.previsoes = {}    # (lat, lon, data) -> JSON compacto em binário
+            self.modelos = {}      # (lat, lon, tipo, versao) -> bytes
+            self.historico = {}    # (lat, lon) -> DataFrame
+
+    # previsoes
+    def buscar_previsao_no_banco(self, lat, lon, date):
+        dados = self.previsoes.get((float(lat), float(lon), pd.Timestamp(date)))
+        return None if dados is None else expandir(decodificar(dados))
+
+    def salvar_previsao_no_banco(self, lat, lon, date, resultado_json):
+        with self._lock:
+            self.previsoes[(float(lat), float(lon), pd.Timestamp(date))] = codificar(compactar(resultado_json, exato=True))
+
+    def apagar_previsoes_no_banco(self, lat, lon):
+        with self._lock:
+            for chave in [c for c in self.previsoes if c[:2] == (float(lat), float(lon))]:
+                del self.previsoes[chave]
+
+    # modelos_treinados
+    def salvar_modelo_no_banco(self, lat, lon, tipo, modelo, versao=''):
+        blob = pickle.dumps(modelo)
+        with self._lock:
+            self.modelos[_local_modelo(lat, lon) + (tipo, versao)] = blob
+        return len(blob)
+
+    def buscar_modelo_serializado(self, lat, lon, tipo, versao=None):
+        local = _local_modelo(lat, lon)
+        with self._lock:
+            candidatos = [(c[3], blob) for c, blob in self.modelos.items() if c[:3] == local + (tipo,)]
+        if versao is not None:
+            candidatos = [c for c in candidatos if c[0] == versao]
+        if not candidatos:
+            return None
+        versao_banco, blob = max(candidatos, key=lambda c: c[0])
+        return blob, versao_banco
+
+    def buscar_versao_modelo(self, lat, lon, tipo):
+        resultado = self.buscar_modelo_serializado(lat, lon, tipo)
+        return None if resultado is None else resultado[1]
+
+    # historico_localizacao
+    def existe_dados_historicos(self, lat, lon):
+        return history_store.existe(lat, lon) or (float(lat), float(lon)) in self.historico
+
+    def salvar_dados_historicos(self, lat, lon, df_local, batch_size=None, progress=None):
+        novos = df_local.reindex(columns=COLUNAS_HISTORICO).copy()
+        with self._lock:
+            atual = self.historico.get((float(lat), float(lon)))
+            if atual is not None:
+                novos = novos[~novos['Timestamp_Local'].isin(atual['Timestamp_Local'])]
+                self.historico[(float(lat), float(lon))] = pd.concat([atual, novos], ignore_index=True)
+            else:
+                self.historico[(float(lat), float(lon))] = novos
+        if progress:
+            progress(len(novos), len(novos))
+        return len(novos)
+
+    def buscar_celulas_com_historico(self):
+        return list(self.historico)
+
+    def buscar_ultimo_historico(self, lat, lon):
+        df = self.historico.get((float(lat), float(lon)))
+        return None if df is None else df['Timestamp_Local'].max()
+
+
+banco = BancoEmMemoria()
+
+# Módulo -> nomes importados de store_forecast (ou definidos nele) a substituir
+_FUNCOES = {
+    "app.services.modelos": ("salvar_previsao_no_banco", "salvar_dados_historicos", "existe_dados_historicos"),
+    "app.services.forecast_cache": ("buscar_previsao_no_banco", "apagar_previsoes_no_banco"),
+    "app.services.model_registry": ("salvar_modelo_no_banco", "buscar_modelo_serializado", "buscar_versao_modelo"),
+    "app.services.refresh": ("salvar_dados_historicos", "buscar_celulas_com_historico", "buscar_ultimo_historico"),
+    "app.services.global_model": ("existe_dados_historicos",),
+    "app.services.batch": ("salvar_previsao_no_banco",),
+}
+
+
+def instalar():
+    """Aponta as funções de banco da aplicação para o `banco` em memória."""
+    import importlib
+    for nome_modulo, funcoes in _FUNCOES.items():
+        modulo = importlib.import_module(nome_modulo)
+        for funcao in funcoes:
+            setattr(modulo, funcao, getattr(banco, funcao))
+    return banco
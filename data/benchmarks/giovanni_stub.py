@@ -0,0 +1,172 @@
+"""
+Servidor local que imita a API de séries temporais do Giovanni, para medir o
+pipeline sem depender do serviço real.
+
+Responde GET /timeseries?data=...&location=[lat,lon]&time=inicio/fim com o CSV
+no layout do Giovanni, recortado no intervalo pedido. As séries vêm de
+payloads gravados (um arquivo <variável>.csv por variável em --payload-dir)
+ou são sintéticas. Latência e limites de vazão são configuráveis; acima do
+limite o servidor responde 429 com Retry-After, como o serviço real.
+
+Uso isolado (a partir de data/):
+    python -m benchmarks.giovanni_stub --port 8765 --latency 0.3 --max-concurrent 5
+"""
+import io
+import os
+import time
+import random
+import argparse
+import threading
+from functools import lru_cache
+from urllib.parse import urlparse, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import pandas as pd
+from benchmarks.payloads import synthetic_payload, HEADER_KEYS
+
+# Layout do CSV do Giovanni (o mesmo de app.services.collect_api_giovanni; não
+# é importado de lá para que o stub possa subir antes da configuração da aplicação)
+HEADER_LINES = 13
+TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%S"
+
+
+class GiovanniStub:
+    def __init__(self, payload_dir=None, latency=0.0, jitter=0.0, max_concurrent=None,
+                 rate=None, time_start="2020-01-01T00:00:00", time_end="2025-09-28T00:00:00"):
+        self.payload_dir = payload_dir
+        self.latency = latency
+        self.jitter = jitter
+        self.max_concurrent = max_concurrent
+        self.rate = rate
+        self.time_start = time_start
+        self.time_end = time_end
+        self._lock = threading.Lock()
+        self._em_andamento = 0
+        self._proximo_livre = time.monotonic()
+        self.metrics = {"requests": 0, "throttled": 0, "bytes": 0}
+        self._server = None
+
+    @lru_cache(maxsize=None)
+    def _serie(self, variable):
+        """(cabeçalhos, DataFrame) completos de uma variável, gravados ou sintéticos."""
+        from app.services.collect_api_giovanni import parse_csv
+        caminho = os.path.join(self.payload_dir, f"{variable}.csv") if self.payload_dir else None
+        if caminho and os.path.exists(caminho):
+            with open(caminho, "rb") as f:
+                return parse_csv(f.read())
+        param = variable.rsplit("_", 1)[-1]
+        inicio = pd.Timestamp(self.time_start)
+        # Produtos M2T1NX são médias horárias, com carimbo no meio da hora
+        if "M2T1NX" in variable:
+            inicio += pd.Timedelta(minutes=30)
+        payload = synthetic_payload(param=param, time_start=inicio.strftime(TIMESTAMP_FORMAT), time_end=self.time_end)
+        return parse_csv(payload)
+
+    @lru_cache(maxsize=256)
+    def _tabela(self, variable, time_start, time_end):
+        """Linhas do CSV no intervalo (a parte cara de gerar, reaproveitada entre células)."""
+        _, df = self._serie(variable)
+        recorte = df[(df["Timestamp"] >= pd.Timestamp(time_start)) & (df["Timestamp"] <= pd.Timestamp(time_end))]
+        return recorte.to_csv(header=False, index=False, date_format=TIMESTAMP_FORMAT, float_format="%.6g")
+
+    def render(self, variable, lat, lon, time_start, time_end):
+        headers, _ = self._serie(variable)
+        cabecalho = dict(headers, begin_time=time_start, end_time=time_end, lat=lat, lon=lon, user_lat=lat, user_lon=lon)
+        buf = io.StringIO()
+        for chave in list(HEADER_KEYS)[:HEADER_LINES]:
+            buf.write(f"{chave},{cabecalho.get(chave, '')}\n")
+        buf.write("\n")
+        buf.write(f"Timestamp (UTC),{headers['param_short_name']}\n")
+        buf.write(self._tabela(variable, time_start, time_end))
+        return buf.getvalue().encode("utf-8")
+
+    def _admitir(self):
+        """Aplica os limites de concorrência e de vazão; False = responder 429."""
+        with self._lock:
+            self.metrics["requests"] += 1
+            agora = time.monotonic()
+            if self.max_concurrent and self._em_andamento >= self.max_concurrent:
+                self.metrics["throttled"] += 1
+                return False
+            if self.rate:
+                if self._proximo_livre > agora:
+                    self.metrics["throttled"] += 1
+                    return False
+                self._proximo_livre = max(self._proximo_livre, agora) + 1.0 / self.rate
+            self._em_andamento += 1
+            return True
+
+    def _liberar(self):
+        with self._lock:
+            self._em_andamento -= 1
+
+    def handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                if url.path != "/timeseries":
+                    self.send_error(404)
+                    return
+                if not stub._admitir():
+                    self.send_response(429)
+                    self.send_header("Retry-After", "1")
+                    self.end_headers()
+                    return
+                try:
+                    query = parse_qs(url.query)
+                    lat, lon = query["location"][0].strip("[]").split(",")
+                    time_start, time_end = query["time"][0].split("/")
+                    corpo = stub.render(query["data"][0], lat, lon, time_start, time_end)
+                    time.sleep(stub.latency + random.uniform(0, stub.jitter))
+                    self.send_response(200)
+                    self.send_header("Content-Type", "text/csv")
+                    self.send_header("Content-Length", str(len(corpo)))
+                    self.end_headers()
+                    self.wfile.write(corpo)
+                    with stub._lock:
+                        stub.metrics["bytes"] += len(corpo)
+                except (KeyError, ValueError) as e:
+                    self.send_error(400, str(e))
+                finally:
+                    stub._liberar()
+
+        return Handler
+
+    def start(self, host="127.0.0.1", port=0):
+        """Sobe o servidor numa thread e devolve a URL do endpoint /timeseries."""
+        self._server = ThreadingHTTPServer((host, port), self.handler())
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name="giovanni-stub", daemon=True).start()
+        return f"http://{host}:{self._server.server_address[1]}/timeseries"
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--payload-dir")
+    parser.add_argument("--latency", type=float, default=0.0, help="Atraso fixo por resposta (s)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Atraso aleatório extra, até este valor (s)")
+    parser.add_argument("--max-concurrent", type=int, help="Requisições simultâneas antes de responder 429")
+    parser.add_argument("--rate", type=float, help="Requisições/s antes de responder 429")
+    args = parser.parse_args()
+
+    stub = GiovanniStub(args.payload_dir, args.latency, args.jitter, args.max_concurrent, args.rate)
+    print(f"Giovanni local em {stub.start(port=args.port)} (Ctrl+C para parar)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        stub.stop()
+
+
+if __name__ == "__main__":
+    main()
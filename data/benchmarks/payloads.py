@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+
+HEADER_KEYS = (
+    "prod_name", "param_short_name", "param_name", "unit", "begin_time",
+    "end_time", "lat", "lon", "request_time", "service", "version",
+    "user_lat", "user_lon",
+)
+
+
+def synthetic_payload(param="TLML", time_start="2020-01-01T00:00:00",
+                      time_end="2025-09-28T00:00:00", lat=-16.34, lon=-46.88,
+                      seed=0):
+    """
+    Gera um CSV no mesmo layout do Giovanni (13 linhas de cabeçalho, linha em
+    branco, cabeçalho da tabela e uma linha por hora) para os benchmarks,
+    quando não há um payload gravado disponível.
+    """
+    rng = np.random.default_rng(seed)
+    ts = pd.date_range(time_start, time_end, freq="h")
+    values = 280 + 10 * np.sin(np.arange(len(ts)) * 2 * np.pi / 24) + rng.normal(0, 1, len(ts))
+    header_values = {
+        "prod_name": "SingleTimeSeries",
+        "param_short_name": param,
+        "param_name": param,
+        "unit": "K",
+        "begin_time": time_start,
+        "end_time": time_end,
+        "lat": lat,
+        "lon": lon,
+        "request_time": "2025-10-01 00:00:00",
+        "service": "ArAvTs",
+        "version": "1.0",
+        "user_lat": lat,
+        "user_lon": lon,
+    }
+    lines = [f"{k},{header_values[k]}" for k in HEADER_KEYS]
+    lines.append("")
+    lines.append(f"Timestamp (UTC),{param}")
+    lines.extend(f"{t:%Y-%m-%dT%H:%M:%S},{v:.6f}" for t, v in zip(ts, values))
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def load_payload(path=None, **kwargs):
+    """Lê um payload gravado do Giovanni ou gera um sintético."""
+    if path:
+        with open(path, "rb") as f:
+            return f.read()
+    return synthetic_payload(**kwargs)
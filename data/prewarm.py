@@ -0,0 +1,5 @@
+from app.services.prewarm import main
+
+# Exemplo: python prewarm.py --bbox -34 -74 6 -34 --workers 4 --rate 2
+if __name__ == '__main__':
+    main()
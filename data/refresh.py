@@ -0,0 +1,12 @@
+import os
+
+# O processo termina logo após a rodada: o horizonte de cada célula precisa ser
+# gravado na hora, e não na fila de segundo plano (antes de importar a configuração)
+os.environ["FORECAST_STORE_ASYNC"] = "0"
+
+from app.services.refresh import executar_refresh
+
+# Rodada única do refresh incremental (ex: via cron)
+if __name__ == '__main__':
+    atualizadas = executar_refresh()
+    print(f"Células atualizadas: {len(atualizadas)}")
@@ -1,16 +1,19 @@
 from app.__init__ import create_app
+from app.config_env import Config
+from app.services.refresh import iniciar_scheduler
 from waitress import serve
 app = create_app()
 
 
 
 if __name__ == '__main__':
+    iniciar_scheduler()
     print("Servidor de produção Waitress iniciado em http://127.0.0.1:8000")
     serve(
         app,
         host='127.0.0.1',
         port=8000,
-        threads=8,  # Número de threads para processar requisições simultaneamente
+        threads=Config.WAITRESS_THREADS,  # Número de threads para processar requisições simultaneamente (também dimensiona o pool do banco)
         
         # --- AQUI ESTÁ A CONFIGURAÇÃO DO TIMEOUT ---
         # Aumenta o timeout de inatividade do canal para 20 minutos (1200 segundos).
@@ -8,17 +8,25 @@ CREATE TABLE previsoes (
     lat FLOAT NOT NULL,
     lon FLOAT NOT NULL,
     data TIMESTAMP NOT NULL,
-    resultado JSONB NOT NULL,
+    -- JSON compacto sem arredondamento (app.services.forecast_format) comprimido com zlib.
+    -- Bancos existentes (as previsões são recalculadas sob demanda):
+    --   TRUNCATE previsoes; ALTER TABLE previsoes ALTER COLUMN resultado TYPE BYTEA USING NULL;
+    resultado BYTEA NOT NULL,
     PRIMARY KEY (lat, lon, data)
 );
 
 -- Tabela para modelos treinados (armazenando como arquivo binário ou string base64)
+-- Um modelo por (localização, variável, versão dos dados de treino).
+-- Modelos globais (app.services.global_model) usam o canto sudoeste do shard como
+-- lat/lon e o prefixo 'global_' no tipo (ex: 'global_temperature').
 CREATE TABLE modelos_treinados (
     lat FLOAT NOT NULL,
     lon FLOAT NOT NULL,
     tipo VARCHAR(32) NOT NULL,
+    versao VARCHAR(64) NOT NULL DEFAULT '',
     modelo_pickle BYTEA NOT NULL,
-    PRIMARY KEY (lat, lon, tipo)
+    treinado_em TIMESTAMP NOT NULL DEFAULT now(),
+    PRIMARY KEY (lat, lon, tipo, versao)
 );
 CREATE TABLE historico_localizacao (
     lat FLOAT NOT NULL,
@@ -0,0 +1,5 @@
+from app.services.global_model import main
+
+# Exemplo: python train_global.py --workers 4 --region grid --max-cells 100 --time stride --step 6
+if __name__ == '__main__':
+    main()